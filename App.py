@@ -1,59 +1,65 @@
-import tensorflow as tf
-import asyncio
 import os
 from flask import Flask, render_template, request, jsonify
-from scapy.all import sniff, get_if_list
-from scapy.utils import PcapWriter
-from scapy.utils import wrpcap
-import pandas as pd
+# Only the interface list is needed to serve pages; scapy's layers, pandas and pyshark are
+# imported by the capture code that uses them (see start_sniffing and process_packet)
+from scapy.arch import get_if_list
 import numpy as np
 import threading
-import joblib
 import time
-from extract_features import extract_pcap_features
+from feedback_store import FeedbackStore
+from verdict_cache import VerdictCache
+from prefilter import Prefilter
+from host_sketches import HostMonitor
+from model_registry import ModelRegistry, resolve_paths
+from detection_service import RemoteBackend
+from attack_types import served_attack_types
 
 # Flask app instance
 app = Flask(__name__)
 
-# Paths to models and scaler
-RF_MODEL_PATH = "/Users/avinash/Documents/capstone Project/models/random_forest_multiclass.joblib"
-NN_MODEL_PATH = "/Users/avinash/Documents/capstone Project/models/neural_network_multiclass.h5"
+# Paths to models, scaler and other artifacts (from IDS_* env vars or the IDS_CONFIG file, see model_registry.py)
+PATHS = resolve_paths()
 
-# Load models and scaler
-rf_model = joblib.load(RF_MODEL_PATH)
-nn_model = tf.keras.models.load_model(NN_MODEL_PATH)
+# Class id -> attack type name of the served models (from models/label_mapping.json, see attack_types.py)
+ATTACK_TYPES = served_attack_types(PATHS['label_mapping'])
+
+# Models and scaler are loaded and warmed up in the background (by whichever process runs the pipeline)
+model_registry = ModelRegistry(PATHS)
+
+# Allowlist of trusted flows that skip model inference (see prefilter_rules.example.json)
+prefilter = Prefilter.from_file(PATHS['prefilter_rules'])
+
+# Fixed-memory per-host sketches for scan/flood detection
+# Sampled-out flows of a host flagged for a scan or DDoS get that class instead of a reused Benign
+# verdict; there is no single DoS class, so DoS hosts' flows stay with the models then
+host_monitor = HostMonitor(attack_classes={name: value for value, name in ATTACK_TYPES.items()
+                                           if name in ('Portscan', 'DDoS')},
+                           benign_class=next((value for value, name in ATTACK_TYPES.items() if name == 'Benign'), 0))
+
+# Cache of recent verdicts keyed by quantized scaled features
+verdict_cache = VerdictCache(max_size=50000, ttl=300, decimals=2)
+
+# Analyst feedback and background model updates
+feedback_store = FeedbackStore(PATHS['feedback'])
+update_status = {"running": False, "message": "No update has run yet."}
+update_lock = threading.Lock()  # Guards update_status["running"] so only one update job starts
 
 # Global variables for packet capturing
 capturing = False
 processed_packets = []  # Store the processed packets for the frontend
 packet_buffer = []  # Buffer for live packet capturing
 BATCH_SIZE = 100  # Number of packets to process as one batch
-
-# Attack type mapping
-ATTACK_TYPES = {
-    0: "Benign",
-    1: "DDoS",
-    2: "Web Attack ï¿½ Brute Force",
-    3: "Web Attack ï¿½ XSS",
-    4: "Web Attack ï¿½ Sql Injection",
-    5: "DoS slowloris",
-    6: "DoS Slowhttptest",
-    7: "DoS Hulk",
-    8: "DoS GoldenEye",
-    9: "Heartbleed",
-    10: "FTP-Patator",
-    11: "SSH-Patator",
-    12: "Portscan",
-    13: "Infiltration",
-    14: "Bot"
-    # Add more attack types based on your model's output classes
-}
+PACKET_HISTORY = 1000  # Processed packets kept in memory for the frontend to catch up on
+MAX_PACKETS_PER_POLL = 500  # Most packets returned by one /get_packets call
+next_packet_id = 0  # Sequence id given to every processed flow
 
 
 def preprocess_data(features):
     """
     Load and preprocess features for prediction, using the saved scaler.
     """
+    import pandas as pd
+
     try:
         # Load the feature data
         df = pd.DataFrame(features)
@@ -64,11 +70,8 @@ def preprocess_data(features):
         if df.isnull().values.any():
             df.fillna(0, inplace=True)
 
-        # Load the saved scaler
-        scaler = joblib.load("/Users/avinash/Documents/capstone Project/models/scaler.joblib")
-
-        # Transform the features using the loaded scaler
-        features_transformed = scaler.transform(df)
+        # Transform the features using the scaler loaded by the model registry
+        features_transformed = model_registry.scaler.transform(df)
         return features_transformed
     except Exception as e:
         print("Error loading or preprocessing data:")
@@ -76,10 +79,39 @@ def preprocess_data(features):
         return None
 
 
+def predict_verdicts(processed_data):
+    """
+    Hybrid RF/NN verdict for every row of scaled features.
+    Rows whose quantized features are in the verdict cache skip the models entirely.
+    """
+    keys = verdict_cache.keys_for(processed_data)
+    generation = verdict_cache.generation  # Read before the models, so verdicts of replaced models aren't cached
+    verdicts = verdict_cache.get_many(keys)
+    misses = [i for i, verdict in enumerate(verdicts) if verdict is None]
+
+    if misses:
+        # Take both models together so an update can't swap one mid-batch
+        rf, nn = model_registry.models()
+        rf_predictions = list(map(int, rf.predict(processed_data[misses])))
+        nn_probabilities = nn.predict(processed_data[misses], verbose=0)
+        nn_predictions = list(map(int, np.argmax(nn_probabilities, axis=1)))
+
+        # If the models disagree, go with the Neural Network
+        new_verdicts = [nn_pred if rf_pred != nn_pred else rf_pred
+                        for rf_pred, nn_pred in zip(rf_predictions, nn_predictions)]
+        verdict_cache.put_many([keys[i] for i in misses], new_verdicts, generation)
+        for i, verdict in zip(misses, new_verdicts):
+            verdicts[i] = verdict
+
+    return verdicts
+
+
 def write_buffer_to_pcap(buffer, pcap_path="temp_live_capture.pcap"):
     """
     Write the buffered packets to a temporary .pcap file for feature extraction.
     """
+    from scapy.utils import PcapWriter, wrpcap
+
     try:
         # Check if file exists
         file_exists = os.path.isfile(pcap_path)
@@ -105,7 +137,9 @@ def process_packet(packet):
     Callback function for sniffing live packets.
     Buffers packets and processes them when the buffer reaches the batch size.
     """
-    global packet_buffer, processed_packets
+    global packet_buffer, processed_packets, next_packet_id
+    import pandas as pd
+    from extract_features import extract_pcap_features
 
     try:
         # Add the packet to the buffer
@@ -124,21 +158,46 @@ def process_packet(packet):
 
                 # Verify and preprocess the extracted features
                 if extracted_features is not None and len(extracted_features) > 0:
-                    # Create a separate DataFrame for preprocessing and models, excluding unnecessary columns
-                    model_data = extracted_features.drop(['src_ip', 'dst_ip', 'protocol'], axis=1, errors='ignore')
-
-                    # Preprocess the data
-                    processed_data = preprocess_data(model_data)
-
-                    # Get predictions from the models
-                    rf_predictions = list(map(int, rf_model.predict(processed_data)))
-                    nn_probabilities = nn_model.predict(processed_data)
-                    nn_predictions = list(map(int, np.argmax(nn_probabilities, axis=1)))
+                    # Allowlisted flows are Benign without any model call
+                    allowed = prefilter.apply(extracted_features)
+                    final_predictions = [0] * len(extracted_features)
+                    host_alerts = [None] * len(extracted_features)
+                    model_rows = np.flatnonzero(~allowed)
+
+                    if len(model_rows) > 0:
+                        # Per-host sketches; flows of hosts already flagged for a scan/flood are sampled
+                        candidates = extracted_features.iloc[model_rows]
+                        host_monitor.observe(candidates)
+                        to_model, reused, alerts = host_monitor.route(candidates)
+                        for i, verdict, alert in zip(model_rows, reused, alerts):
+                            host_alerts[i] = alert
+                            if verdict is not None:
+                                final_predictions[i] = verdict
+                        model_rows = model_rows[to_model]
+
+                    if len(model_rows) > 0:
+                        # Never block the sniff callback on model loading (or a failed load). The capture
+                        # pcap is cumulative, so these flows are extracted again with the next batch.
+                        if not model_registry.ready:
+                            error = f": {model_registry.error}" if model_registry.error else ""
+                            raise RuntimeError(f"models not ready ({model_registry.state}{error}), batch skipped")
+
+                        # Create a separate DataFrame for preprocessing and models, excluding unnecessary columns
+                        model_data = extracted_features.iloc[model_rows].drop(['src_ip', 'dst_ip', 'protocol'],
+                                                                              axis=1, errors='ignore')
+
+                        # Preprocess the data
+                        processed_data = preprocess_data(model_data)
+
+                        # Get predictions from the cache or the models
+                        verdicts = predict_verdicts(processed_data)
+                        for i, verdict in zip(model_rows, verdicts):
+                            final_predictions[i] = verdict
+                        host_monitor.record_verdicts(extracted_features.iloc[model_rows], verdicts)
 
                     # Combine the features with predictions and format for the frontend
                     for i in range(len(extracted_features)):
-                        # Determine final prediction
-                        final_pred = nn_predictions[i] if rf_predictions[i] != nn_predictions[i] else rf_predictions[i]
+                        final_pred = final_predictions[i]
                         attack_type = ATTACK_TYPES.get(final_pred, "Unknown")
 
                         # Extract relevant packet information (including src_ip and dest_ip for printing/display)
@@ -149,13 +208,17 @@ def process_packet(packet):
                         flow_duration = extracted_features.iloc[i].get('Flow Duration', 0)
 
                         # Create a packet entry
+                        next_packet_id += 1
                         packet_entry = {
+                            "id": next_packet_id,
                             "flow_duration": float(flow_duration),
                             "source": src_ip,
                             "destination": dst_ip,
                             "destination_port": int(destination_port),
                             "protocol": protocol,
                             "prediction": attack_type,
+                            "prediction_id": final_pred,
+                            "host_alert": host_alerts[i],  # Scan/flood alert on the source or destination host
                             "features": extracted_features.iloc[i].to_dict()
                             # Include all original features for display
                         }
@@ -163,9 +226,9 @@ def process_packet(packet):
                         # Add to processed packets
                         processed_packets.append(packet_entry)
 
-                    # Keep only the latest 100 packets to prevent memory issues
-                    if len(processed_packets) > 100:
-                        processed_packets = processed_packets[-100:]
+                    # Keep only the latest packets to prevent memory issues
+                    if len(processed_packets) > PACKET_HISTORY:
+                        processed_packets = processed_packets[-PACKET_HISTORY:]
 
                     print(f"Processed {len(extracted_features)} packets. Total in memory: {len(processed_packets)}")
                 else:
@@ -185,6 +248,7 @@ def start_sniffing(interface):
     global capturing
     capturing = True
     print(f"Started sniffing on interface: {interface}")
+    from scapy.all import sniff  # Loads every layer, so captured packets are fully dissected
     sniff(iface=interface, prn=process_packet, stop_filter=lambda x: not capturing)
 
 
@@ -197,6 +261,154 @@ def stop_sniffing():
     print("Stopped sniffing.")
 
 
+def start_capture_command(interface):
+    """
+    Start capturing packets on the selected network interface.
+    """
+    global processed_packets
+    processed_packets = []  # Reset previous capture data
+
+    # Start sniffing in a separate thread
+    threading.Thread(target=start_sniffing, args=(interface,), daemon=True).start()
+    return {"status": f"Started capturing on {interface}."}, 200
+
+
+def stop_capture_command():
+    """
+    Stop capturing packets.
+    """
+    stop_sniffing()
+    return {"status": "Stopped capturing packets."}, 200
+
+
+def label_command(packet_id, label):
+    """
+    Store an analyst's confirmation or correction of a verdict for a later model update.
+    """
+    if label not in ATTACK_TYPES:
+        return {"error": f"Unknown attack type: {label}"}, 400
+
+    entry = next((p for p in processed_packets if p["id"] == packet_id), None)
+    if entry is None:
+        return {"error": f"Packet {packet_id} is no longer in memory."}, 404
+
+    features = {k: v for k, v in entry["features"].items() if k not in ('src_ip', 'dst_ip', 'protocol')}
+    feedback_store.add(features, label, entry["prediction_id"])
+    return {"status": f"Packet {packet_id} labelled as {ATTACK_TYPES[label]}."}, 200
+
+
+def run_model_update():
+    """
+    Background job: warm-start the models on new labelled flows, save them and hot-swap them in.
+    """
+    # Imported here: keeps sklearn off the web process's startup path
+    from incremental_update import update_models, save_models, DEFAULT_UPDATE_CONFIG
+
+    try:
+        feedback, total = feedback_store.pending()
+        if len(feedback) < DEFAULT_UPDATE_CONFIG['min_rows']:
+            update_status["message"] = (f"Only {len(feedback)} new labelled flows; "
+                                        f"need {DEFAULT_UPDATE_CONFIG['min_rows']} to update.")
+            return
+
+        if not model_registry.ready:
+            update_status["message"] = "Models are not loaded yet."
+            return
+
+        rf, nn = model_registry.models()
+        new_rf, new_nn, notes = update_models(rf, nn, model_registry.scaler, feedback, PATHS['replay'])
+        save_models(new_rf, new_nn, PATHS['rf'], PATHS['nn'])
+
+        model_registry.swap(new_rf, new_nn)
+        verdict_cache.clear()  # Cached verdicts came from the old models
+        feedback_store.mark_consumed(total)
+        update_status["message"] = " ".join([f"Models updated on {len(feedback)} labelled flows at {time.ctime()}."]
+                                            + notes)
+    except Exception as e:
+        print(f"Error updating models: {e}")
+        update_status["message"] = f"Model update failed: {e}"
+    finally:
+        with update_lock:
+            update_status["running"] = False
+        print(update_status["message"])
+
+
+def packet_details_command(packet_id):
+    """
+    Return all extracted features of one packet, for the details view.
+    """
+    entry = next((p for p in processed_packets if p["id"] == packet_id), None)
+    if entry is None:
+        return {"error": f"Packet {packet_id} is no longer in memory."}, 404
+    return {"id": packet_id, "features": entry["features"]}, 200
+
+
+def update_models_command():
+    """
+    Start a background model update from the labelled flows, unless one is already running.
+    """
+    with update_lock:
+        if not update_status["running"]:
+            update_status["running"] = True
+            update_status["message"] = "Model update running..."
+            threading.Thread(target=run_model_update, daemon=True).start()
+        return dict(update_status), 200
+
+
+# Commands the web layer can send to the detection pipeline
+COMMANDS = {
+    "start_capture": start_capture_command,
+    "stop_capture": stop_capture_command,
+    "label": label_command,
+    "update_models": update_models_command,
+    "packet_details": packet_details_command,
+}
+
+
+def snapshot():
+    """
+    Everything the read-only endpoints serve, in one dict.
+    """
+    return {
+        # Packet summaries without the ~70 features, which are fetched per packet on demand
+        "packets": [{k: v for k, v in p.items() if k != "features"} for p in processed_packets],
+        "health": model_registry.health(),
+        "cache": verdict_cache.stats(),
+        "prefilter": prefilter.stats(),
+        "hosts": host_monitor.stats(),
+        "update": dict(update_status),
+    }
+
+
+class LocalBackend:
+    """
+    Runs the detection pipeline inside the web process (`python App.py`, development mode).
+    """
+
+    def __init__(self):
+        model_registry.load_async()
+
+    def call(self, name, *args):
+        return COMMANDS[name](*args)
+
+    def snapshot(self):
+        return snapshot()
+
+
+backend = None
+
+
+def get_backend():
+    """
+    The pipeline backend: a separate detection service when IDS_DETECTOR_ADDRESS is set
+    (see serve.py), otherwise the pipeline in this process.
+    """
+    global backend
+    if backend is None:
+        backend = RemoteBackend.from_env() if os.environ.get('IDS_DETECTOR_ADDRESS') else LocalBackend()
+    return backend
+
+
 @app.route('/')
 def index():
     """
@@ -205,6 +417,15 @@ def index():
     return render_template('index.html')
 
 
+@app.route('/health', methods=['GET'])
+def health():
+    """
+    Report whether the models are loaded and warmed up (503 until they are).
+    """
+    status = get_backend().snapshot()["health"]
+    return jsonify(status), 200 if status["ready"] else 503
+
+
 @app.route('/networks', methods=['GET'])
 def list_networks():
     """
@@ -219,13 +440,9 @@ def start_capture():
     """
     Start capturing packets on the selected network interface.
     """
-    global processed_packets
-    processed_packets = []  # Reset previous capture data
     interface = request.json.get("interface")  # Selected network interface
-
-    # Start sniffing in a separate thread
-    threading.Thread(target=start_sniffing, args=(interface,), daemon=True).start()
-    return jsonify({"status": f"Started capturing on {interface}."})
+    result, status = get_backend().call("start_capture", interface)
+    return jsonify(result), status
 
 
 @app.route('/stop_capture', methods=['POST'])
@@ -233,28 +450,24 @@ def stop_capture():
     """
     Stop capturing packets.
     """
-    stop_sniffing()
-    return jsonify({"status": "Stopped capturing packets."})
+    result, status = get_backend().call("stop_capture")
+    return jsonify(result), status
 
 
 @app.route('/get_packets', methods=['GET'])
 def get_packets():
     """
     Return processed packets for the frontend to display.
-    This endpoint will be polled by the frontend.
+    This endpoint will be polled by the frontend with `since` set to the last sequence id it has,
+    so only new packets (oldest first, at most MAX_PACKETS_PER_POLL) are sent.
     """
-    global processed_packets
     try:
-        # If there are no processed packets yet, return an empty array
-        if not processed_packets:
-            return jsonify({"packets": []})
-
-        # Return the most recent packets first (up to 20)
-        recent_packets = processed_packets[-20:]
-        print(recent_packets)
-        # Return in reverse order so newest are at the top
+        since = request.args.get("since", default=0, type=int)
+        packets = [p for p in get_backend().snapshot()["packets"] if p["id"] > since]
         return jsonify({
-            "packets": recent_packets
+            "packets": packets[-MAX_PACKETS_PER_POLL:],
+            "latest_id": packets[-1]["id"] if packets else since,
+            "dropped": max(0, len(packets) - MAX_PACKETS_PER_POLL),
         })
     except Exception as e:
         print(f"Error retrieving packet data: {e}")
@@ -264,15 +477,74 @@ def get_packets():
         }), 500
 
 
-if __name__ == '__main__':
-    # Set event loop policy
-    if hasattr(asyncio, "set_event_loop_policy"):
-        try:
-            asyncio.set_event_loop_policy(asyncio.DefaultEventLoopPolicy())
-        except Exception as e:
-            print(f"Warning: Could not set event loop policy: {e}")
+@app.route('/packet/<int:packet_id>', methods=['GET'])
+def packet_details(packet_id):
+    """
+    Return the full feature set of one processed packet.
+    """
+    result, status = get_backend().call("packet_details", packet_id)
+    return jsonify(result), status
+
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """
+    Return verdict cache size and hit-rate metrics.
+    """
+    return jsonify(get_backend().snapshot()["cache"])
+
+
+@app.route('/prefilter_stats', methods=['GET'])
+def prefilter_stats():
+    """
+    Return per-rule hit counts and how many flows skipped the models.
+    """
+    return jsonify(get_backend().snapshot()["prefilter"])
+
+
+@app.route('/host_alerts', methods=['GET'])
+def host_alerts():
+    """
+    Return hosts flagged for scans or floods by the per-host sketches.
+    """
+    return jsonify(get_backend().snapshot()["hosts"])
 
-    # Activate asyncio child watcher
-    asyncio.get_child_watcher().attach_loop(asyncio.new_event_loop())
 
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+@app.route('/attack_types', methods=['GET'])
+def attack_types():
+    """
+    Return the attack type names the analyst can label flows with.
+    """
+    return jsonify(ATTACK_TYPES)
+
+
+@app.route('/label', methods=['POST'])
+def label_packet():
+    """
+    Store an analyst's confirmation or correction of a verdict for a later model update.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        packet_id, label = int(data["id"]), int(data["label"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Both 'id' and 'label' must be integers."}), 400
+    result, status = get_backend().call("label", packet_id, label)
+    return jsonify(result), status
+
+
+@app.route('/update_models', methods=['GET', 'POST'])
+def update_models_route():
+    """
+    POST starts a background model update from the labelled flows; GET reports its status.
+    """
+    if request.method == 'POST':
+        result, status = get_backend().call("update_models")
+        return jsonify(result), status
+    return jsonify(get_backend().snapshot()["update"])
+
+
+if __name__ == '__main__':
+    # Development mode: pipeline and Flask's threaded server in one process.
+    # For production use `python serve.py`, which runs the pipeline as a separate service.
+    get_backend()
+    app.run(host='0.0.0.0', port=8080, threaded=True, debug=os.environ.get('IDS_DEBUG') == '1', use_reloader=False)
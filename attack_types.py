@@ -0,0 +1,68 @@
+import json
+import os
+import re
+
+# Attack type mapping: model output class -> attack type name
+ATTACK_TYPES = {
+    0: "Benign",
+    1: "DDoS",
+    2: "Web Attack ï¿½ Brute Force",
+    3: "Web Attack ï¿½ XSS",
+    4: "Web Attack ï¿½ Sql Injection",
+    5: "DoS slowloris",
+    6: "DoS Slowhttptest",
+    7: "DoS Hulk",
+    8: "DoS GoldenEye",
+    9: "Heartbleed",
+    10: "FTP-Patator",
+    11: "SSH-Patator",
+    12: "Portscan",
+    13: "Infiltration",
+    14: "Bot"
+    # Add more attack types based on your model's output classes
+}
+
+
+def _normalize(name):
+    return re.sub('[^a-z0-9]', '', name.lower())
+
+
+def label_mapping_mismatches(label_mapping):
+    """
+    :return: Descriptions of the classes a training label mapping (label -> encoded value, see
+        training_pipeline) encodes differently from ATTACK_TYPES; names are compared ignoring case and punctuation.
+    """
+    return [f"{value}: {label!r} vs {ATTACK_TYPES[value]!r}" for label, value in label_mapping.items()
+            if value in ATTACK_TYPES and _normalize(label) != _normalize(ATTACK_TYPES[value])]
+
+
+def check_label_mapping(label_mapping):
+    """
+    Make sure a training label mapping encodes the classes the way ATTACK_TYPES names them.
+    :raises ValueError: On any disagreement.
+    """
+    mismatched = label_mapping_mismatches(label_mapping)
+    if mismatched:
+        raise ValueError("Label mapping disagrees with ATTACK_TYPES: " + "; ".join(mismatched))
+
+
+def served_attack_types(label_mapping_path):
+    """
+    Class id -> attack type name for the served models, from the label_mapping.json that
+    training_pipeline.run_pipeline publishes next to them, so merged or reordered classes keep
+    their names. Labels matching an ATTACK_TYPES name (ignoring case and punctuation) use its
+    spelling. Without a mapping file the built-in ATTACK_TYPES are used.
+    """
+    if not label_mapping_path or not os.path.isfile(label_mapping_path):
+        print(f"No label mapping found at: {label_mapping_path}; using the built-in ATTACK_TYPES")
+        return dict(ATTACK_TYPES)
+    with open(label_mapping_path) as f:
+        label_mapping = json.load(f)
+
+    mismatched = label_mapping_mismatches(label_mapping)
+    if mismatched:
+        print(f"Warning: class ids in {label_mapping_path} differ from ATTACK_TYPES ({'; '.join(mismatched)}); "
+              f"serving the names from the label mapping")
+    canonical = {_normalize(name): name for name in ATTACK_TYPES.values()}
+    return {int(value): canonical.get(_normalize(label), label)
+            for label, value in sorted(label_mapping.items(), key=lambda item: item[1])}
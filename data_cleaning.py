@@ -3,7 +3,11 @@ import numpy as np
 import random
 import os
 import glob
+import shutil
+import tempfile
 import matplotlib.pyplot as plt
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 random.seed(0)
 
@@ -141,32 +145,165 @@ def clean_dataset(dataset, filetypes=['feather']):
             df.to_parquet(f'{dataset}/clean/{file}.parquet', index=False)
 
 
-def aggregate_data(dataset, save=True, filetype='feather'):
-    all_data_list = []
-    for file in glob.glob(f'{dataset}/clean/*.{filetype}'):
-        print(file)
+def _read_schema(file, filetype):
+    if filetype == 'feather':
+        with pa.memory_map(file) as source:
+            return pa.ipc.open_file(source).schema
+    return pq.read_schema(file)
+
+
+def _aggregate_schema(files, filetype):
+    """
+    Build one Arrow schema covering every cleaned file, so batches from different days can be
+    written to the same output. Numeric columns are promoted the same way pd.concat would.
+    """
+    columns = {}
+    for file in files:
+        for field in _read_schema(file, filetype):
+            if field.name.startswith('__index_level_'):
+                continue
+            columns.setdefault(field.name, []).append(field.type)
+
+    fields = []
+    for name, types in columns.items():
+        if name in ('Label', 'Timestamp'):
+            fields.append(pa.field(name, pa.string()))
+            continue
+        dtype = np.result_type(*[t.to_pandas_dtype() for t in types])
+        if len(types) < len(files) and dtype.kind in 'iub':
+            dtype = np.dtype('float64')  # missing in some files -> NaN
+        fields.append(pa.field(name, pa.from_numpy_dtype(dtype)))
+    return pa.schema(fields)
+
+
+def _conform(df, schema):
+    """
+    Reindex a cleaned DataFrame to the aggregate schema and cast every column to its target type.
+    """
+    df = df.reindex(columns=schema.names)
+    for field in schema:
+        if pa.types.is_string(field.type):
+            df[field.name] = df[field.name].astype('string')
+        else:
+            df[field.name] = df[field.name].astype(field.type.to_pandas_dtype())
+    return df
+
+
+def _row_fingerprints(df, subset):
+    """
+    Hash each row's feature vector into a 64-bit fingerprint.
+    """
+    return pd.util.hash_pandas_object(df[subset], index=False).to_numpy(dtype=np.uint64)
+
+
+def _dedup_masks(hash_files, partitions):
+    """
+    Find the first occurrence of every fingerprint across all files.
+    Fingerprints are split into `partitions` buckets and each bucket is deduplicated on its own,
+    so only about 1/partitions of the fingerprints are held in memory at a time.
+    :return: One boolean keep-mask per file.
+    """
+    masks = [np.zeros(np.load(h, mmap_mode='r').shape[0], dtype=bool) for h in hash_files]
+
+    for part in range(partitions):
+        seen = np.empty(0, dtype=np.uint64)
+        for hash_file, mask in zip(hash_files, masks):
+            hashes = np.load(hash_file, mmap_mode='r')
+            rows = np.flatnonzero(hashes % np.uint64(partitions) == part)
+            values = np.asarray(hashes[rows])
+
+            # Keep the first occurrence within this file...
+            unique, first = np.unique(values, return_index=True)
+            # ...unless an earlier file already had it
+            pos = np.searchsorted(seen, unique)
+            pos[pos == len(seen)] = 0
+            new = seen[pos] != unique if len(seen) else np.ones(len(unique), dtype=bool)
+
+            mask[rows[first[new]]] = True
+            seen = np.union1d(seen, unique[new])
+        print(f"Partition {part + 1}/{partitions}: {len(seen)} unique rows")
+
+    return masks
+
+
+def aggregate_data(dataset, save=True, filetype='feather', partitions=1):
+    """
+    Combine the cleaned files into all/malicious/benign datasets with duplicate rows removed.
+    Files are streamed one at a time: every row is reduced to a 64-bit fingerprint of its features,
+    duplicates are found on the fingerprints, and the kept rows are written to all three outputs
+    in a single pass. Raise `partitions` when the fingerprints (8 bytes per row) do not fit in RAM.
+    :param dataset: Dataset directory containing the `clean` folder.
+    :param save: Write the aggregated files. If False only the counts are reported.
+    :param filetype: 'feather' or 'parquet'.
+    :param partitions: Number of hash partitions to deduplicate separately.
+    :return: Number of rows kept per label.
+    """
+    outputs = {
+        'all': f'{dataset}/clean/all_data.{filetype}',
+        'malicious': f'{dataset}/clean/all_malicious.{filetype}',
+        'benign': f'{dataset}/clean/all_benign.{filetype}',
+    }
+    files = sorted(f for f in glob.glob(f'{dataset}/clean/*.{filetype}') if f not in outputs.values())
+    if not files:
+        print(f"No cleaned .{filetype} files found in {dataset}/clean")
+        return {}
+
+    schema = _aggregate_schema(files, filetype)
+    subset = [name for name in schema.names if name not in ('Label', 'Timestamp')]
+
+    def read(file):
         df = pd.read_feather(file) if filetype == 'feather' else pd.read_parquet(file)
-        print(df.shape)
-        print(f'{df["Label"].value_counts()}\n')
-        all_data_list.append(df)
+        return _conform(df, schema)
+
+    # Pass 1: fingerprint every file, spilling the hashes to disk
+    hash_dir = tempfile.mkdtemp(prefix='dedup_', dir=f'{dataset}/clean')
+    try:
+        hash_files = []
+        for i, file in enumerate(files):
+            print(file)
+            df = read(file)
+            print(df.shape)
+            print(f'{df["Label"].value_counts()}\n')
+            hash_file = os.path.join(hash_dir, f'{i}.npy')
+            np.save(hash_file, _row_fingerprints(df, subset))
+            hash_files.append(hash_file)
+            del df
 
-    all_data = pd.concat(all_data_list, ignore_index=True)
-    duplicates = all_data[all_data.duplicated(subset=all_data.columns.difference(['Label', 'Timestamp']))]
-    all_data.drop(duplicates.index, axis=0, inplace=True)
-    all_data.reset_index(inplace=True, drop=True)
+        masks = _dedup_masks(hash_files, partitions)
+    finally:
+        shutil.rmtree(hash_dir, ignore_errors=True)
 
+    # Pass 2: write the kept rows to all outputs at once
+    writers = {}
     if save:
-        malicious = all_data[all_data.Label != 'Benign'].reset_index(drop=True)
-        benign = all_data[all_data.Label == 'Benign'].reset_index(drop=True)
-
-        if filetype == 'feather':
-            all_data.to_feather(f'{dataset}/clean/all_data.feather')
-            malicious.to_feather(f'{dataset}/clean/all_malicious.feather')
-            benign.to_feather(f'{dataset}/clean/all_benign.feather')
-        if filetype == 'parquet':
-            all_data.to_parquet(f'{dataset}/clean/all_data.parquet', index=False)
-            malicious.to_parquet(f'{dataset}/clean/all_malicious.parquet', index=False)
-            benign.to_parquet(f'{dataset}/clean/all_benign.parquet', index=False)
+        for name, path in outputs.items():
+            if filetype == 'feather':
+                # Uncompressed so training can memory-map the file (see training_data.open_dataset)
+                writers[name] = pa.ipc.new_file(path, schema)
+            else:
+                writers[name] = pq.ParquetWriter(path, schema)
+
+    counts = {}
+    try:
+        for file, mask in zip(files, masks):
+            df = read(file)[mask]
+            for label, count in df['Label'].value_counts().items():
+                counts[label] = counts.get(label, 0) + int(count)
+            if not save:
+                continue
+
+            is_benign = (df['Label'] == 'Benign').to_numpy(dtype=bool)
+            parts = {'all': df, 'malicious': df[~is_benign], 'benign': df[is_benign]}
+            for name, part in parts.items():
+                writers[name].write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+            del df, parts
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    print(f"Kept {sum(counts.values())} unique rows")
+    print(f'{pd.Series(counts, dtype="int64").sort_values(ascending=False)}\n')
+    return counts
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def near_duplicate_rows(X, y, rows, decimals, batch_size=262144):
+    """
+    Drop rows whose scaled features are equal after rounding to `decimals`, within the same class.
+    The first row of every group is kept.
+    :param rows: Candidate row indices (sorted).
+    :return: Sorted indices of the rows that are kept.
+    """
+    hashes = np.empty(len(rows), dtype=np.uint64)
+    for start in range(0, len(rows), batch_size):
+        stop = min(start + batch_size, len(rows))
+        chunk = np.round(np.asarray(X[rows[start:stop]]), decimals) + 0.0  # + 0.0 folds -0.0 into 0.0
+        frame = pd.DataFrame(chunk, copy=False)
+        frame['label'] = y[rows[start:stop]]
+        hashes[start:stop] = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    _, first = np.unique(hashes, return_index=True)
+    return rows[np.sort(first)]
+
+
+def stratified_cap(y, rows, max_per_class, seed=42):
+    """
+    Randomly sample at most `max_per_class` rows of every class; smaller classes are kept whole.
+    :return: Sorted indices of the sampled rows.
+    """
+    rng = np.random.default_rng(seed)
+    labels = y[rows]
+    keep = []
+    for cls in np.unique(labels):
+        members = rows[labels == cls]
+        if len(members) > max_per_class:
+            members = rng.choice(members, max_per_class, replace=False)
+        keep.append(members)
+    return np.sort(np.concatenate(keep))
+
+
+def reduce_training_set(X, y, n_train, max_per_class=None, dedup_decimals=None, seed=42):
+    """
+    Build a smaller, class-aware training set out of the first `n_train` (shuffled) rows.
+    Near-duplicates are removed first, then each class is capped, so rare classes such as
+    Heartbleed and Infiltration keep every sample while Benign is cut down.
+    :param max_per_class: Maximum number of rows per class, or None for no cap.
+    :param dedup_decimals: Rounding used to detect near-duplicates, or None to skip.
+    :return: Sorted training row indices.
+    """
+    rows = np.arange(n_train)
+    before = np.bincount(y[rows])
+    if dedup_decimals is not None:
+        rows = near_duplicate_rows(X, y, rows, dedup_decimals)
+    if max_per_class is not None:
+        rows = stratified_cap(y, rows, max_per_class, seed)
+    after = np.bincount(y[rows], minlength=len(before))
+
+    print(f"Reduced training set from {n_train} to {len(rows)} rows")
+    print(pd.DataFrame({'before': before, 'after': after}))
+    return rows
+
+
+def compare_reductions(config, settings, include_nn=False):
+    """
+    Train on each reduction setting and report accuracy against training time and model size.
+    Every model is evaluated on the same full held-out split.
+    :param config: Training config (see training_pipeline.DEFAULT_CONFIG).
+    :param settings: List of `reduction` dicts, e.g. {'max_per_class': 100000, 'dedup_decimals': 3}.
+    :param include_nn: Also train the Neural Network for every setting.
+    :return: DataFrame with one row per (setting, model), including per-class recall.
+    """
+    from training_pipeline import DEFAULT_CONFIG, prepare_data, _train_rf, _train_nn
+
+    config = {**DEFAULT_CONFIG, **config}
+    results = []
+    for setting in settings:
+        setting = {**DEFAULT_CONFIG['reduction'], **setting}
+        stages = prepare_data({**config, 'reduction': setting})
+        names = {str(idx): label for label, idx in stages['label_mapping'].items()}
+        worker_stages = {k: v for k, v in stages.items() if k not in ('keys', 'label_mapping')}
+        rows = stages['n_train']
+        if stages['reduced'] is not None:
+            rows = len(np.load(os.path.join(stages['reduced'], 'train_idx.npy'), mmap_mode='r'))
+
+        rf_config = dict(config['rf'])
+        if rf_config['n_jobs'] is None:
+            rf_config['n_jobs'] = -1
+        models = [('Random Forest', 'random_forest_multiclass.joblib',
+                   lambda path: _train_rf(path, worker_stages, rf_config, config['seed']))]
+        if include_nn:
+            models.append(('Neural Network', 'neural_network_multiclass.h5',
+                           lambda path: _train_nn(path, worker_stages, len(names), config['nn'],
+                                                  config['validation_split'], config['seed'],
+                                                  os.path.join(path, 'backup'))))
+
+        for model_name, filename, train in models:
+            with tempfile.TemporaryDirectory() as path:
+                start = time.perf_counter()
+                train(path)
+                fit_seconds = time.perf_counter() - start
+                size_mb = os.path.getsize(os.path.join(path, filename)) / 2 ** 20
+                with open(os.path.join(path, 'report.json')) as f:
+                    report = json.load(f)
+
+            result = {
+                'max_per_class': setting['max_per_class'],
+                'dedup_decimals': setting['dedup_decimals'],
+                'model': model_name,
+                'train_rows': rows,
+                'fit_seconds': round(fit_seconds, 1),
+                'size_mb': round(size_mb, 2),
+                'accuracy': report['accuracy'],
+                'macro_recall': report['macro avg']['recall'],
+            }
+            for idx, label in names.items():
+                result[f'recall {label}'] = report.get(idx, {}).get('recall', np.nan)
+            results.append(result)
+
+    results = pd.DataFrame(results)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(results)
+    return results
+
+
+if __name__ == "__main__":
+    from model import config
+
+    compare_reductions(config, [
+        {'max_per_class': None, 'dedup_decimals': None},
+        {'max_per_class': None, 'dedup_decimals': 3},
+        {'max_per_class': 500000, 'dedup_decimals': 3},
+        {'max_per_class': 100000, 'dedup_decimals': 3},
+        {'max_per_class': 20000, 'dedup_decimals': 3},
+    ])
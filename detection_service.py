@@ -0,0 +1,245 @@
+"""
+Detection pipeline as a separate process, so web request handling never competes with
+packet capture and inference for the same interpreter.
+
+Channel between the two:
+  - state (recent packets, stats, health) is published several times a second as a JSON
+    snapshot in shared memory, guarded by a sequence number, so web workers read it without
+    any round trip to the service;
+  - commands (start/stop capture, label, update models) go over an authenticated
+    multiprocessing.connection socket.
+
+Run standalone with `python detection_service.py` (e.g. next to `gunicorn -w 4 App:app`), or let
+serve.py start it. Both sides read IDS_DETECTOR_ADDRESS, IDS_DETECTOR_AUTHKEY and IDS_SNAPSHOT_NAME.
+"""
+import json
+import os
+import struct
+import threading
+import time
+from multiprocessing import AuthenticationError, shared_memory, resource_tracker
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+DEFAULT_ADDRESS = '127.0.0.1:6001'
+DEFAULT_SNAPSHOT_NAME = 'ids_snapshot'
+SNAPSHOT_SIZE = 8 * 2 ** 20
+PUBLISH_INTERVAL = 0.25  # Seconds between snapshots
+# A snapshot older than this means the service is down, or restarted and publishes to a new segment
+STALE_AFTER = 8 * PUBLISH_INTERVAL
+
+_HEADER = struct.Struct('QQd')  # sequence number (odd while writing), payload length, publish time
+_SEQUENCE = struct.Struct('Q')  # Written on its own, so length and time are always in place before an even sequence
+_INFO = struct.Struct('Qd')  # Payload length and publish time
+_INFO_OFFSET = _SEQUENCE.size
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host, int(port)
+
+
+def env_settings():
+    """
+    :return: (address, authkey, snapshot name) from the environment.
+    """
+    authkey = os.environ.get('IDS_DETECTOR_AUTHKEY')
+    if not authkey:
+        raise RuntimeError("IDS_DETECTOR_AUTHKEY must be set for the detection service")
+    return (parse_address(os.environ.get('IDS_DETECTOR_ADDRESS', DEFAULT_ADDRESS)), authkey.encode(),
+            os.environ.get('IDS_SNAPSHOT_NAME', DEFAULT_SNAPSHOT_NAME))
+
+
+class SnapshotWriter:
+    """
+    Single writer of the shared-memory snapshot.
+    """
+
+    def __init__(self, name, size=SNAPSHOT_SIZE):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left over from a previous run that didn't shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.sequence = 0
+        _HEADER.pack_into(self.shm.buf, 0, 0, 0, 0.0)
+
+    def publish(self, payload):
+        data = json.dumps(payload, default=_json_default).encode()
+        if len(data) > self.shm.size - _HEADER.size:
+            print(f"Snapshot of {len(data)} bytes does not fit in shared memory; skipped")
+            return
+        self.sequence += 1  # Odd: write in progress
+        _SEQUENCE.pack_into(self.shm.buf, 0, self.sequence)
+        self.shm.buf[_HEADER.size:_HEADER.size + len(data)] = data
+        _INFO.pack_into(self.shm.buf, _INFO_OFFSET, len(data), time.time())
+        self.sequence += 1  # Even: consistent
+        _SEQUENCE.pack_into(self.shm.buf, 0, self.sequence)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SnapshotReader:
+    """
+    Reader side of the snapshot; re-parses only when the sequence number changed.
+    A reader stays attached to the segment it opened, so once `published_at` is older than
+    STALE_AFTER it should be closed and a new one opened (see RemoteBackend.snapshot).
+    """
+
+    def __init__(self, name):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Don't let this process's resource tracker unlink the writer's segment on exit
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self._sequence = None
+        self._payload = None
+        self.published_at = 0.0  # time.time() of the last snapshot read
+
+    def read(self, retries=1000):
+        for _ in range(retries):
+            sequence, length, published_at = _HEADER.unpack_from(self.shm.buf, 0)
+            if sequence == self._sequence:
+                return self._payload
+            if sequence % 2 or sequence == 0:
+                time.sleep(0.0005)  # Writer is mid-update (or hasn't published yet)
+                continue
+            if not 0 < length <= self.shm.size - _HEADER.size:
+                time.sleep(0.0005)  # Torn header
+                continue
+            data = bytes(self.shm.buf[_HEADER.size:_HEADER.size + length])
+            if _SEQUENCE.unpack_from(self.shm.buf, 0)[0] != sequence:
+                continue
+            try:
+                payload = json.loads(data)
+            except ValueError:
+                continue  # Torn read the sequence check didn't catch; try again
+            self._sequence, self._payload, self.published_at = sequence, payload, published_at
+            return payload
+        raise TimeoutError("Could not read a consistent snapshot")
+
+    def close(self):
+        self.shm.close()
+
+
+# What the web layer serves while the detection service is unreachable
+UNAVAILABLE_SNAPSHOT = {
+    "packets": [],
+    "health": {"ready": False, "state": "detection service unavailable", "error": None},
+    "cache": {},
+    "prefilter": {},
+    "hosts": {},
+    "update": {"running": False, "message": "Detection service unavailable."},
+}
+
+
+class RemoteBackend:
+    """
+    Web-side proxy for a detection service running in another process.
+    """
+
+    def __init__(self, address, authkey, snapshot_name):
+        self.address = address
+        self.authkey = authkey
+        self.snapshot_name = snapshot_name
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(*env_settings())
+
+    def call(self, name, *args):
+        try:
+            with Client(self.address, authkey=self.authkey) as conn:
+                conn.send((name, args))
+                return conn.recv()
+        except (OSError, EOFError, AuthenticationError) as e:
+            print(f"Detection service unavailable: {e}")
+            return {"error": "Detection service unavailable."}, 503
+
+    def snapshot(self):
+        with self._lock:
+            try:
+                for _ in range(2):
+                    if self._reader is None:
+                        self._reader = SnapshotReader(self.snapshot_name)
+                    payload = self._reader.read()
+                    if time.time() - self._reader.published_at <= STALE_AFTER:
+                        return payload
+                    # Reattach: a restarted service publishes to a new segment under the same name
+                    self._reader.close()
+                    self._reader = None
+                raise TimeoutError(f"No snapshot published in the last {STALE_AFTER} seconds")
+            except (FileNotFoundError, TimeoutError, ValueError) as e:
+                print(f"Detection service snapshot unavailable: {e}")
+                return UNAVAILABLE_SNAPSHOT
+
+
+def _handle(conn, commands):
+    with conn:
+        try:
+            name, args = conn.recv()
+            command = commands.get(name)
+            conn.send(command(*args) if command else ({"error": f"Unknown command: {name}"}, 400))
+        except Exception as e:
+            print(f"Error handling command: {e}")
+            try:
+                conn.send(({"error": str(e)}, 500))
+            except OSError:
+                pass
+
+
+def run_service(address, authkey, snapshot_name):
+    """
+    Run the capture/inference pipeline from App.py in this process and serve it to the web layer.
+    """
+    import App  # The pipeline lives in App.py (imported here because App imports RemoteBackend from this module)
+
+    App.model_registry.load_async()
+    writer = SnapshotWriter(snapshot_name)
+    stop = threading.Event()
+
+    def publish_loop():
+        while not stop.is_set():
+            try:
+                writer.publish(App.snapshot())
+            except Exception as e:
+                print(f"Error publishing snapshot: {e}")
+            stop.wait(PUBLISH_INTERVAL)
+
+    threading.Thread(target=publish_loop, daemon=True).start()
+    print(f"Detection service listening on {address[0]}:{address[1]}")
+    try:
+        with Listener(address, authkey=authkey) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:  # e.g. AuthenticationError from a client with the wrong key
+                    print(f"Rejected connection: {e}")
+                    continue
+                threading.Thread(target=_handle, args=(conn, App.COMMANDS), daemon=True).start()
+    finally:
+        stop.set()
+        writer.close()
+
+
+def run_service_from_env():
+    run_service(*env_settings())
+
+
+if __name__ == "__main__":
+    run_service_from_env()
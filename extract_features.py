@@ -159,16 +159,14 @@ def extract_pcap_features(pcap_file):
     return df
 
 
-# Run feature extraction
-pcap_file = "/Users/avinash/Documents/capstone Project/capture.pcap"
-df = extract_pcap_features(pcap_file)
+if __name__ == "__main__":
+    # Run feature extraction
+    pcap_file = "/Users/avinash/Documents/capstone Project/capture.pcap"
+    df = extract_pcap_features(pcap_file)
 
+    # Save extracted features to CSV, replacing 'inf' and '-inf' values
+    output_file = "/Users/avinash/Documents/capstone Project/extracted_features.csv"
 
-# Save extracted features to CSV, replacing 'inf' and '-inf' values
-output_file = "/Users/avinash/Documents/capstone Project/extracted_features.csv"
-
-
-
-# Save the DataFrame to a CSV file
-df.to_csv(output_file, index=False)
-print(f"Feature extraction complete! Data saved to {output_file}.")
+    # Save the DataFrame to a CSV file
+    df.to_csv(output_file, index=False)
+    print(f"Feature extraction complete! Data saved to {output_file}.")
@@ -0,0 +1,62 @@
+import csv
+import json
+import os
+import threading
+import time
+
+
+class FeedbackStore:
+    """
+    Append-only CSV of analyst-labelled flows, used for incremental model updates.
+    A small JSON state file records how many rows have already been consumed by an update.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state_path = f"{path}.state.json"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def add(self, features, label, prediction):
+        """
+        Store one labelled flow.
+        :param features: Dict of model feature values for the flow.
+        :param label: Analyst label (encoded attack type).
+        :param prediction: The verdict the models gave (encoded attack type).
+        """
+        row = dict(features)
+        row['Label'] = int(label)
+        row['Prediction'] = int(prediction)
+        row['Labelled At'] = time.time()
+        with self._lock:
+            new_file = not os.path.isfile(self.path)
+            with open(self.path, 'a', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+
+    def _consumed(self):
+        if not os.path.isfile(self.state_path):
+            return 0
+        with open(self.state_path) as f:
+            return json.load(f).get('consumed', 0)
+
+    def pending(self):
+        """
+        Labelled flows that no update has consumed yet.
+        :return: (DataFrame of new rows, total row count to pass to `mark_consumed`)
+        """
+        import pandas as pd  # Only needed by model updates, not by the web process
+
+        with self._lock:
+            if not os.path.isfile(self.path):
+                return pd.DataFrame(), 0
+            df = pd.read_csv(self.path)
+        consumed = self._consumed()
+        return df.iloc[consumed:].reset_index(drop=True), len(df)
+
+    def mark_consumed(self, total):
+        with self._lock:
+            with open(self.state_path, 'w') as f:
+                json.dump({'consumed': int(total), 'updated_at': time.time()}, f)
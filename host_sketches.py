@@ -0,0 +1,247 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+
+def _hash64(value):
+    return hash(str(value)) & MASK64
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch using 2**p one-byte registers (standard error about 1.04 / sqrt(2**p)).
+    """
+
+    def __init__(self, p=8):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # Small-range correction
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """
+    Frequency sketch with `depth` rows of `width` counters; estimates never undercount.
+    """
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key):
+        h = _hash64(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return (h1 + self._rows * h2) % self.width
+
+    def add(self, key, count=1):
+        self.counts[self._rows, self._columns(key)] += count
+
+    def estimate(self, key):
+        return int(self.counts[self._rows, self._columns(key)].min())
+
+    def clear(self):
+        self.counts[:] = 0
+
+
+class HostMonitor:
+    """
+    Streaming per-host aggregation in fixed memory, for attacks that are spread over many flows
+    or packets (port scans, DoS and DDoS). Per time window it keeps:
+      - Count-Min sketches of packets sent by and received by every host,
+      - HyperLogLogs of distinct destination ports and peers per source, and of distinct
+        sources per destination, for at most `max_hosts` hosts (least recently seen are dropped).
+    Hosts that cross a threshold are flagged. Flows to or from a flagged host are then sampled:
+    only one in `sample_rate` goes to the models, the rest reuse that host's last attack verdict.
+    The extractor re-emits every flow of the capture so far on each batch, with cumulative packet
+    counts. Only the packets a flow gained since it was last seen are added: a fixed-size Count-Min
+    sketch of packets already counted per flow gives that delta. Its estimates never undercount,
+    so a flow's packets are never counted twice.
+    """
+
+    def __init__(self, window=60, max_hosts=10000, hll_p=8, port_scan_threshold=100, flood_threshold=20000,
+                 ddos_sources_threshold=50, sample_rate=20, flag_ttl=300, attack_classes=None, benign_class=0,
+                 counted_width=65536):
+        """
+        :param window: Seconds after which the sketches are reset.
+        :param port_scan_threshold: Distinct destination ports from one source per window.
+        :param flood_threshold: Packets from (DoS) or to (DDoS) one host per window.
+        :param ddos_sources_threshold: Distinct sources sending to one destination per window.
+        :param sample_rate: Keep 1 in this many flows of a flagged host for the models.
+        :param flag_ttl: Seconds a host stays flagged after its last alert.
+        :param attack_classes: Host alert name ('Portscan', 'DoS', 'DDoS') -> model class to report for
+            sampled-out flows when the host's last model verdict was `benign_class`. Without a class,
+            such flows keep going to the models.
+        :param counted_width: Width of the sketch of packets already counted per flow; collisions
+            only make floods look smaller, never larger.
+        """
+        self.window = window
+        self.max_hosts = max_hosts
+        self.hll_p = hll_p
+        self.port_scan_threshold = port_scan_threshold
+        self.flood_threshold = flood_threshold
+        self.ddos_sources_threshold = ddos_sources_threshold
+        self.sample_rate = sample_rate
+        self.flag_ttl = flag_ttl
+        self.attack_classes = attack_classes or {}
+        self.benign_class = benign_class
+
+        self.packets_from = CountMinSketch()
+        self.packets_to = CountMinSketch()
+        # Packets already counted per flow key; not reset per window, as the extractor's counts are cumulative
+        self.counted = CountMinSketch(width=counted_width)
+        self._hosts = OrderedDict()  # host -> {'ports': HLL, 'peers': HLL, 'sources': HLL}
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.flagged = {}  # host -> alert dict
+        self.alerts = []  # Most recent host-level alerts
+        self._last_verdict = {}  # flagged host -> last model verdict for its flows
+        self._seen = {}  # flagged host -> flows seen since flagging, for sampling
+        self.sampled_out = 0
+
+    def _host(self, host):
+        sketches = self._hosts.get(host)
+        if sketches is None:
+            sketches = {name: HyperLogLog(self.hll_p) for name in ('ports', 'peers', 'sources')}
+            self._hosts[host] = sketches
+            if len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return sketches
+
+    def _rotate(self, now):
+        if now - self._window_start >= self.window:
+            self.packets_from.clear()
+            self.packets_to.clear()
+            self._hosts.clear()
+            self._window_start = now
+        for host in [h for h, alert in self.flagged.items() if now - alert['last_seen'] > self.flag_ttl]:
+            del self.flagged[host]
+            self._last_verdict.pop(host, None)
+            self._seen.pop(host, None)
+
+    def _flag(self, host, attack, detail, now):
+        alert = self.flagged.get(host)
+        if alert is None or alert['attack'] != attack:
+            alert = {'host': host, 'attack': attack, 'detail': detail, 'first_seen': now, 'last_seen': now,
+                     'time': time.time()}
+            self.flagged[host] = alert
+            self.alerts = (self.alerts + [alert])[-100:]
+            print(f"Host alert: {attack} involving {host} ({detail})")
+        alert['last_seen'] = now
+        alert['detail'] = detail
+
+    def observe(self, flows):
+        """
+        Add the new packets of a batch of extract_pcap_features flows to the sketches and raise
+        host alerts. Flows without new packets since they were last seen are skipped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._rotate(now)
+            touched_src, touched_dst = set(), set()
+            rows = zip(flows['src_ip'], flows['dst_ip'], flows['Destination Port'], flows['protocol'],
+                       flows['Total Fwd Packets'])
+            for src, dst, port, protocol, packets in rows:
+                key = (src, dst, port, protocol)
+                new_packets = int(packets) - self.counted.estimate(key)
+                if new_packets <= 0:
+                    continue
+                self.counted.add(key, new_packets)
+                self.packets_from.add(src, new_packets)
+                self.packets_to.add(dst, new_packets)
+                src_sketches = self._host(src)
+                src_sketches['ports'].add(port)
+                src_sketches['peers'].add(dst)
+                self._host(dst)['sources'].add(src)
+                touched_src.add(src)
+                touched_dst.add(dst)
+
+            for src in touched_src:
+                sketches = self._hosts.get(src)
+                ports = sketches['ports'].count() if sketches else 0
+                packets_sent = self.packets_from.estimate(src)
+                if ports >= self.port_scan_threshold:
+                    self._flag(src, 'Portscan', f'{ports} distinct ports', now)
+                elif packets_sent >= self.flood_threshold:
+                    self._flag(src, 'DoS', f'{packets_sent} packets sent', now)
+
+            for dst in touched_dst:
+                sketches = self._hosts.get(dst)
+                sources = sketches['sources'].count() if sketches else 0
+                packets_received = self.packets_to.estimate(dst)
+                if sources >= self.ddos_sources_threshold and packets_received >= self.flood_threshold:
+                    self._flag(dst, 'DDoS', f'{packets_received} packets from {sources} sources', now)
+
+    def route(self, flows):
+        """
+        Decide which flows still need the models. A sampled-out flow reuses its host's last model
+        verdict, or the class of the host alert when that verdict was benign.
+        :return: (bool array, True = send to the models; list of reused verdicts, None where not reused;
+            list of host alert names, None for flows not involving a flagged host)
+        """
+        to_model = np.ones(len(flows), dtype=bool)
+        reused = [None] * len(flows)
+        host_alerts = [None] * len(flows)
+        with self._lock:
+            if not self.flagged:
+                return to_model, reused, host_alerts
+            for i, (src, dst) in enumerate(zip(flows['src_ip'], flows['dst_ip'])):
+                host = src if src in self.flagged else dst if dst in self.flagged else None
+                if host is None:
+                    continue
+                attack = self.flagged[host]['attack']
+                host_alerts[i] = attack
+                verdict = self._last_verdict.get(host)
+                if verdict == self.benign_class:
+                    verdict = self.attack_classes.get(attack)
+                if verdict is None:
+                    continue
+                self._seen[host] = self._seen.get(host, 0) + 1
+                if self._seen[host] % self.sample_rate:
+                    to_model[i] = False
+                    reused[i] = verdict
+                    self.sampled_out += 1
+        return to_model, reused, host_alerts
+
+    def record_verdicts(self, flows, verdicts):
+        """
+        Remember the latest model verdict for flows of flagged hosts, for `route` to reuse.
+        """
+        with self._lock:
+            for src, dst, verdict in zip(flows['src_ip'], flows['dst_ip'], verdicts):
+                for host in (src, dst):
+                    if host in self.flagged:
+                        self._last_verdict[host] = verdict
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked_hosts": len(self._hosts),
+                "flagged_hosts": list(self.flagged.values()),
+                "recent_alerts": self.alerts[-20:],
+                "flows_sampled_out": self.sampled_out,
+            }
@@ -0,0 +1,123 @@
+"""
+Load test for the web/API layer: measures request latency of the polled endpoints with several
+concurrent clients, first while idle and then while capture is saturated by a local UDP flood.
+
+    python serve.py &
+    python load_test.py --url http://127.0.0.1:8080 --interface lo --clients 20 --duration 30
+
+Flat latency under saturated capture has not been shown yet. The only run so far (20 clients, 20 s,
+single-core machine, no models loaded so no inference, no tshark so no feature extraction) gave:
+
+    idle:      918 req/s, p50 21.6 ms, p95 28.5 ms, p99 33.0 ms
+    saturated: 453 req/s, p50 40.9 ms, p95 79.5 ms, p99 107.6 ms
+
+On one core the flood, the capture process and the web workers share the CPU, so this doesn't
+isolate the web layer; rerun on a multi-core host with the models loaded before relying on it.
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+ENDPOINTS = ['/get_packets', '/health', '/cache_stats', '/host_alerts']
+
+
+def _client(url, stop, latencies, errors):
+    i = 0
+    while not stop.is_set():
+        endpoint = ENDPOINTS[i % len(ENDPOINTS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url + endpoint, timeout=10) as response:
+                response.read()
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            # /health answers 503 until the models are ready; that still measures the web layer
+            if getattr(e, 'code', None) == 503:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(str(e))
+
+
+def measure(url, clients, duration):
+    """
+    :return: Latency percentiles in milliseconds plus request and error counts.
+    """
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=_client, args=(url, stop, latencies, errors), daemon=True)
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 2) if len(ms) else None,
+        "p99_ms": round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+    }
+
+
+def udp_flood(target, stop, payload=b'x' * 512):
+    """
+    Send UDP packets to `target` as fast as possible, to saturate capture on that interface.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    port = target[1]
+    while not stop.is_set():
+        sock.sendto(payload, (target[0], port))
+        port = target[1] + (port - target[1] + 1) % 1000  # Spread over many flows
+
+
+def post(url, data=None):
+    request = urllib.request.Request(url, data=json.dumps(data or {}).encode(),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API latency with and without saturated capture.")
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--interface', default='lo', help="Interface to capture on during the saturated phase")
+    parser.add_argument('--flood-target', default='127.0.0.1:9999', help="Where to send the UDP flood")
+    parser.add_argument('--flood-threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30)
+    args = parser.parse_args()
+
+    print(f"Idle: {args.clients} clients for {args.duration}s...")
+    idle = measure(args.url, args.clients, args.duration)
+    print(idle)
+
+    print(f"Saturated: capturing on {args.interface} under a UDP flood to {args.flood_target}...")
+    print(post(args.url + '/start_capture', {'interface': args.interface}))
+    host, _, port = args.flood_target.rpartition(':')
+    stop = threading.Event()
+    for _ in range(args.flood_threads):
+        threading.Thread(target=udp_flood, args=((host, int(port)), stop), daemon=True).start()
+    try:
+        saturated = measure(args.url, args.clients, args.duration)
+    finally:
+        stop.set()
+        print(post(args.url + '/stop_capture'))
+    print(saturated)
+
+    if idle['p95_ms'] and saturated['p95_ms']:
+        print(f"p95 latency ratio saturated/idle: {saturated['p95_ms'] / idle['p95_ms']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
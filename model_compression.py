@@ -0,0 +1,282 @@
+import copy
+import json
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Variants built by evaluate_variants
+DEFAULT_VARIANTS = {
+    'rf_trees': [10, 25, 50],  # Keep only the first n trees of the stored forest
+    'rf_depths': [10, 20],  # Retrain with this max_depth
+    'nn_quantization': ['float16', 'int8'],  # TensorFlow Lite post-training quantization
+}
+
+
+class TFLiteModel:
+    """
+    TensorFlow Lite model with the Keras `predict` interface, so a quantized Neural Network can be
+    served by App.py (point IDS_NN_MODEL_PATH at the .tflite file).
+    """
+
+    def __init__(self, path):
+        import tensorflow as tf
+
+        with open(path, 'rb') as f:
+            self.content = f.read()
+        self.interpreter = tf.lite.Interpreter(model_content=self.content)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self._rows = None
+        self._lock = threading.Lock()  # The interpreter's tensors are shared between calls
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        with self._lock:
+            if len(X) != self._rows:
+                self.interpreter.resize_tensor_input(self.input_index, X.shape)
+                self.interpreter.allocate_tensors()
+                self._rows = len(X)
+            self.interpreter.set_tensor(self.input_index, X)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+def load_nn_model(path):
+    """
+    Load a Keras model, or a TFLiteModel for .tflite files.
+    """
+    if path.endswith('.tflite'):
+        return TFLiteModel(path)
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+
+def load_model(path):
+    if path.endswith('.joblib'):
+        return joblib.load(path)
+    return load_nn_model(path)
+
+
+def truncate_forest(rf_model, n_trees):
+    """
+    Copy of a Random Forest that keeps only its first `n_trees` trees. Every tree is grown on its
+    own bootstrap sample, so the first n are as good a subset as any.
+    """
+    forest = copy.copy(rf_model)
+    forest.estimators_ = rf_model.estimators_[:n_trees]
+    forest.n_estimators = len(forest.estimators_)
+    return forest
+
+
+def quantize_nn(nn_model, mode, representative=None):
+    """
+    Convert a Keras model with TensorFlow Lite post-training quantization.
+    :param mode: 'float16' (float16 weights) or 'int8' (int8 weights and activations, calibrated on
+        `representative` rows; inputs and outputs stay float32).
+    :return: The .tflite model as bytes.
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(nn_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == 'int8':
+        if representative is None:
+            raise ValueError("int8 quantization needs representative rows for calibration")
+        converter.representative_dataset = lambda: ([row[np.newaxis].astype(np.float32)] for row in representative)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    return converter.convert()
+
+
+def model_memory_bytes(model):
+    """
+    Bytes held by the model's parameters: tree arrays for a Random Forest, weights for a Keras
+    model, the flatbuffer (which holds the weights) for a TFLiteModel.
+    """
+    if isinstance(model, TFLiteModel):
+        return len(model.content)
+    if hasattr(model, 'estimators_'):
+        return sum(tree.tree_.__getstate__()['nodes'].nbytes + tree.tree_.value.nbytes for tree in model.estimators_)
+    return sum(weights.nbytes for weights in model.get_weights())
+
+
+def predict_classes(model, X, batch_size=65536):
+    """
+    Class predictions of a Random Forest or (Keras/TFLite) Neural Network, in batches.
+    """
+    predictions = []
+    for start in range(0, len(X), batch_size):
+        batch = np.asarray(X[start:start + batch_size], dtype=np.float32)
+        if hasattr(model, 'estimators_'):
+            predictions.append(model.predict(batch))
+        else:
+            predictions.append(np.argmax(model.predict(batch, verbose=0), axis=1))
+    return np.concatenate(predictions)
+
+
+def latency_per_1k(model, X, repeats=5):
+    """
+    Median milliseconds to predict a batch of 1000 rows (after one untimed warm-up batch).
+    """
+    batch = np.asarray(X[:1000], dtype=np.float32)
+    predict_classes(model, batch)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_classes(model, batch)
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1000 * 1000 / len(batch)
+
+
+def build_variants(config, stages, output_dir, variants):
+    """
+    Write the compressed variants of the models in config['model_dir'] to `output_dir`.
+    :return: List of (variant name, model family, path), starting with the two stored models.
+    """
+    from data_reduction import stratified_cap
+    from training_pipeline import load_targets, training_rows, _train_rf
+
+    model_dir = config['model_dir']
+    rf_path = os.path.join(model_dir, 'random_forest_multiclass.joblib')
+    nn_path = os.path.join(model_dir, 'neural_network_multiclass.h5')
+    built = [('rf', 'Random Forest', rf_path), ('nn float32', 'Neural Network', nn_path)]
+    os.makedirs(output_dir, exist_ok=True)
+
+    rf_model = joblib.load(rf_path)
+    for n_trees in variants['rf_trees']:
+        if n_trees >= len(rf_model.estimators_):
+            continue  # Same as the stored forest
+        path = os.path.join(output_dir, f'random_forest_{n_trees}_trees.joblib')
+        joblib.dump(truncate_forest(rf_model, n_trees), path)
+        built.append((f'rf {n_trees} trees', 'Random Forest', path))
+    del rf_model
+
+    worker_stages = {k: v for k, v in stages.items() if k not in ('keys', 'label_mapping')}
+    for depth in variants['rf_depths']:
+        rf_config = {**config['rf'], 'max_depth': depth}
+        if rf_config['n_jobs'] is None:
+            rf_config['n_jobs'] = -1
+        print(f"Training Random Forest with max_depth={depth}")
+        _train_rf(output_dir, worker_stages, rf_config, config['seed'])
+        path = os.path.join(output_dir, f'random_forest_depth_{depth}.joblib')
+        os.replace(os.path.join(output_dir, 'random_forest_multiclass.joblib'), path)
+        built.append((f'rf depth {depth}', 'Random Forest', path))
+
+    if variants['nn_quantization']:
+        nn_model = load_nn_model(nn_path)
+        # Calibrate int8 ranges on training rows from every class
+        X = np.load(os.path.join(stages['scaled'], 'X.npy'), mmap_mode='r')
+        y = load_targets(stages['labels'], stages['split'])
+        rows = training_rows(stages)
+        rows = np.arange(stages['n_train']) if rows is None else rows
+        representative = np.asarray(X[stratified_cap(y, rows, 50, config['seed'])])
+        for mode in variants['nn_quantization']:
+            path = os.path.join(output_dir, f'neural_network_{mode}.tflite')
+            with open(path, 'wb') as f:
+                f.write(quantize_nn(nn_model, mode, representative))
+            built.append((f'nn {mode}', 'Neural Network', path))
+    return built
+
+
+def _check_held_out(model_dir, stages):
+    """
+    Fail if the stored models were trained on a different split than the one evaluated on.
+    """
+    path = os.path.join(model_dir, 'training_data.json')
+    if not os.path.isfile(path):
+        print(f"Warning: {path} not found; can't verify the stored models never saw the held-out rows")
+        return
+    with open(path) as f:
+        trained_on = json.load(f)
+    if trained_on != {'scaled': stages['keys']['scaled'], 'n_train': stages['n_train']}:
+        raise ValueError(f"The models in {model_dir} were trained on a different data split than this config "
+                         f"produces, so the held-out rows may include their training rows")
+
+
+def evaluate_variants(config, variants=None, output_dir=None, max_test_rows=None, recall_floor=None):
+    """
+    Build compressed model variants and evaluate each on the held-out split of the cleaned dataset.
+    The split is the one training_pipeline.prepare_data makes for `config`. The stored models have only
+    not seen these rows if run_pipeline trained them with the same data, seed and test_size; this is
+    checked against the training_data.json it writes to model_dir (older models without it only get a warning).
+    :param config: Training config (see training_pipeline.DEFAULT_CONFIG); models are read from its model_dir.
+    :param variants: Overrides for DEFAULT_VARIANTS.
+    :param output_dir: Where the variants are written (default: <model_dir>/compressed).
+    :param max_test_rows: Evaluate on at most this many held-out rows (they are already shuffled).
+    :param recall_floor: If given, also print the fastest variant of each family whose lowest
+        per-class recall meets it.
+    :return: DataFrame with one row per variant: per-class recall, latency per 1k rows,
+        size on disk, parameter memory and load time.
+    """
+    from sklearn.metrics import recall_score
+    from training_pipeline import DEFAULT_CONFIG, prepare_data, load_targets
+    from attack_types import ATTACK_TYPES, check_label_mapping
+
+    config = {**DEFAULT_CONFIG, **config}
+    variants = {**DEFAULT_VARIANTS, **(variants or {})}
+    output_dir = output_dir or os.path.join(config['model_dir'], 'compressed')
+
+    stages = prepare_data(config)
+    check_label_mapping(stages['label_mapping'])  # y_test is encoded with this mapping
+    _check_held_out(config['model_dir'], stages)
+    built = build_variants(config, stages, output_dir, variants)
+
+    n_train = stages['n_train']
+    stop = None if max_test_rows is None else n_train + max_test_rows
+    X_test = np.load(os.path.join(stages['scaled'], 'X.npy'), mmap_mode='r')[n_train:stop]
+    y_test = load_targets(stages['labels'], stages['split'])[n_train:stop]
+    classes = np.unique(y_test)
+    names = {idx: label for label, idx in stages['label_mapping'].items()}
+    names.update(ATTACK_TYPES)
+
+    results = []
+    for name, family, path in built:
+        start = time.perf_counter()
+        model = load_model(path)
+        load_seconds = time.perf_counter() - start
+
+        recall = recall_score(y_test, predict_classes(model, X_test), labels=classes, average=None, zero_division=0)
+        result = {
+            'variant': name,
+            'model': family,
+            'ms_per_1k_rows': round(latency_per_1k(model, X_test), 2),
+            'size_mb': round(os.path.getsize(path) / 2 ** 20, 2),
+            'memory_mb': round(model_memory_bytes(model) / 2 ** 20, 2),
+            'load_seconds': round(load_seconds, 3),
+            'macro_recall': recall.mean(),
+            'min_recall': recall.min(),
+        }
+        for cls, value in zip(classes, recall):
+            result[f'recall {names.get(int(cls), cls)}'] = value
+        results.append(result)
+        del model
+
+    results = pd.DataFrame(results)
+    results.to_csv(os.path.join(output_dir, 'compression_report.csv'), index=False)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(results)
+    if recall_floor is not None:
+        print(f"\nFastest variants with every class recall >= {recall_floor}:")
+        print(fastest_meeting_floor(results, recall_floor))
+    return results
+
+
+def fastest_meeting_floor(results, recall_floor):
+    """
+    :return: The fastest variant of each model family whose lowest per-class recall is at least `recall_floor`.
+    """
+    passing = results[results['min_recall'] >= recall_floor]
+    return passing.sort_values('ms_per_1k_rows').groupby('model', sort=False).head(1)
+
+
+if __name__ == "__main__":
+    from model import config
+
+    evaluate_variants(config, max_test_rows=500000, recall_floor=0.9)
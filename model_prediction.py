@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 import joblib
 from tensorflow.keras.models import load_model
+from model_registry import resolve_paths
 
 
 def load_models(rf_model_path, nn_model_path):
@@ -94,10 +95,11 @@ def hybrid_prediction(rf_model, nn_model, features):
 
 
 def main():
-    # Paths for the models and scaler
-    rf_model_path = "/Users/avinash/Documents/capstone Project/models/random_forest_multiclass.joblib"
-    nn_model_path = "/Users/avinash/Documents/capstone Project/models/neural_network_multiclass.h5"
-    scaler_path = "/Users/avinash/Documents/capstone Project/models/scaler.joblib"
+    # Paths for the models and scaler (IDS_* env vars or IDS_CONFIG, see model_registry.py)
+    paths = resolve_paths()
+    rf_model_path = paths['rf']
+    nn_model_path = paths['nn']
+    scaler_path = paths['scaler']
 
     # Path to the CSV file with extracted features
     feature_csv_path = "/Users/avinash/Documents/capstone Project/extracted_features.csv"
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Artifact name -> (environment variable, default location relative to the model dir or BASE_DIR)
+ARTIFACTS = {
+    'rf': ('IDS_RF_MODEL_PATH', 'model_dir', 'random_forest_multiclass.joblib'),
+    'nn': ('IDS_NN_MODEL_PATH', 'model_dir', 'neural_network_multiclass.h5'),
+    'scaler': ('IDS_SCALER_PATH', 'model_dir', 'scaler.joblib'),
+    'replay': ('IDS_REPLAY_PATH', 'model_dir', 'replay.npz'),
+    'label_mapping': ('IDS_LABEL_MAPPING_PATH', 'model_dir', 'label_mapping.json'),
+    'feedback': ('IDS_FEEDBACK_PATH', 'base_dir', os.path.join('feedback', 'labelled_flows.csv')),
+    'prefilter_rules': ('IDS_PREFILTER_RULES_PATH', 'base_dir', 'prefilter_rules.json'),
+}
+
+
+def resolve_paths(config_path=None):
+    """
+    Resolve artifact paths. For every artifact the first of these wins:
+      1. its own environment variable (e.g. IDS_RF_MODEL_PATH),
+      2. its key in the JSON config file given by `config_path` or IDS_CONFIG,
+      3. the default file name inside IDS_MODEL_DIR / the config's "model_dir" / ./models.
+    :return: Dict of artifact name -> path.
+    """
+    config_path = config_path or os.environ.get('IDS_CONFIG')
+    config = {}
+    if config_path and os.path.isfile(config_path):
+        with open(config_path) as f:
+            config = json.load(f)
+
+    dirs = {
+        'model_dir': os.environ.get('IDS_MODEL_DIR') or config.get('model_dir') or os.path.join(BASE_DIR, 'models'),
+        'base_dir': BASE_DIR,
+    }
+    return {name: os.environ.get(env) or config.get(name) or os.path.join(dirs[base], filename)
+            for name, (env, base, filename) in ARTIFACTS.items()}
+
+
+class ModelRegistry:
+    """
+    Holds the scaler and both models. Loading happens in a background thread (TensorFlow is only
+    imported there), followed by a warm-up prediction so the first live batch doesn't pay for
+    graph tracing. Readers get a consistent (rf, nn) pair and updates are swapped in atomically.
+    """
+
+    def __init__(self, paths=None, warmup_rows=100):
+        self.paths = paths or resolve_paths()
+        self.warmup_rows = warmup_rows
+        self.rf_model = None
+        self.nn_model = None
+        self.scaler = None
+        self.state = 'not loaded'
+        self.error = None
+        self.timings = {}
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def load_async(self):
+        """
+        Start loading in the background; returns immediately.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.load, daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def load(self):
+        try:
+            start = time.perf_counter()
+            self.state = 'loading scaler'
+            self.scaler = joblib.load(self.paths['scaler'])
+            self.timings['scaler'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.state = 'loading random forest'
+            rf_model = joblib.load(self.paths['rf'])
+            self.timings['rf'] = time.perf_counter() - start
+            self.check_label_mapping(rf_model)
+
+            start = time.perf_counter()
+            self.state = 'loading neural network'
+            from model_compression import load_nn_model  # Keras .h5, or a quantized .tflite variant
+            nn_model = load_nn_model(self.paths['nn'])
+            self.timings['nn'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.state = 'warming up'
+            self.warm_up(rf_model, nn_model)
+            self.timings['warmup'] = time.perf_counter() - start
+
+            self.swap(rf_model, nn_model)
+            self.state = 'ready'
+            self._ready.set()
+            print(f"Models loaded and warmed up: {self.timings}")
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            print(f"Error loading models: {e}")
+
+    def check_label_mapping(self, rf_model):
+        """
+        Refuse models whose classes don't match the published label_mapping.json, since the
+        served attack type names come from that file.
+        """
+        path = self.paths.get('label_mapping')
+        if not path or not os.path.isfile(path):
+            return
+        with open(path) as f:
+            label_ids = sorted(json.load(f).values())
+        if label_ids != sorted(int(c) for c in rf_model.classes_):
+            raise ValueError(f"Model classes {list(rf_model.classes_)} don't match the label mapping in {path}")
+
+    def warm_up(self, rf_model, nn_model):
+        """
+        Run one batch of the live batch size (and a single row) through both models.
+        """
+        n_features = getattr(self.scaler, 'n_features_in_', None) or rf_model.n_features_in_
+        for rows in (self.warmup_rows, 1):
+            batch = np.zeros((rows, n_features), dtype=np.float32)
+            rf_model.predict(batch)
+            nn_model.predict(batch, verbose=0)
+
+    def wait(self, timeout=None):
+        """
+        Block until the models are ready. :return: True if ready.
+        """
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def models(self):
+        """
+        :return: The current (rf_model, nn_model) pair.
+        """
+        with self._lock:
+            return self.rf_model, self.nn_model
+
+    def swap(self, rf_model, nn_model):
+        with self._lock:
+            self.rf_model, self.nn_model = rf_model, nn_model
+
+    def health(self):
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+            "paths": {name: self.paths[name] for name in ('rf', 'nn', 'scaler')},
+        }
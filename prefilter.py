@@ -0,0 +1,186 @@
+import bisect
+import ipaddress
+import json
+import os
+import threading
+
+import numpy as np
+
+
+class PrefixTrie:
+    """
+    Binary trie over IP prefixes. `lookup` walks the address bits once and returns every value
+    stored on a prefix that contains the address, most specific first, so the cost depends on
+    the address length rather than on the number of rules.
+    """
+
+    def __init__(self, bits):
+        self.bits = bits
+        self.root = [None, None, []]  # [child 0, child 1, values]
+
+    def insert(self, network, value):
+        node = self.root
+        address = int(network.network_address)
+        for i in range(network.prefixlen):
+            bit = (address >> (self.bits - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, []]
+            node = node[bit]
+        node[2].append(value)
+
+    def lookup(self, address):
+        matches = []
+        node = self.root
+        for i in range(self.bits):
+            matches.extend(node[2])
+            node = node[(address >> (self.bits - 1 - i)) & 1]
+            if node is None:
+                break
+        else:
+            matches.extend(node[2])
+        matches.reverse()
+        return matches
+
+
+def _parse_ports(ports):
+    """
+    Turn "53", "80,443" or "8000-8100" (or a list of those) into sorted, merged (low, high) intervals.
+    """
+    if ports in (None, '', '*', 'any'):
+        return None
+    parts = ports if isinstance(ports, list) else str(ports).split(',')
+    intervals = []
+    for part in parts:
+        low, _, high = str(part).strip().partition('-')
+        intervals.append((int(low), int(high or low)))
+    intervals.sort()
+    merged = [intervals[0]]
+    for low, high in intervals[1:]:
+        if low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+class Prefilter:
+    """
+    Operator-defined allowlist checked before any model inference. Flows matching a rule are
+    marked Benign directly. Rules are indexed by destination prefix in a trie (rules without a
+    destination by source prefix in a second trie) and by port interval, so lookups stay fast
+    with thousands of rules. Only rules with neither `src` nor `dst` are checked for every flow.
+
+    Rule format (JSON list):
+        {"name": "internal-dns", "src": "10.0.0.0/8", "dst": "10.0.0.53/32", "ports": "53", "protocol": "UDP"}
+    `src`, `dst`, `ports` and `protocol` are optional and default to "any". Names must be unique.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self.hits = []
+        self.checked = 0
+        self._dst_tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        self._src_tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}  # Rules without `dst`
+        self._names = set()
+        self._lock = threading.Lock()
+        for rule in rules:
+            self.add_rule(rule)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load rules from a JSON file; a missing file gives an empty prefilter.
+        """
+        if not path or not os.path.isfile(path):
+            print(f"No prefilter rules found at: {path}")
+            return cls()
+        with open(path) as f:
+            rules = json.load(f)
+        print(f"Loaded {len(rules)} prefilter rules from: {path}")
+        return cls(rules)
+
+    def add_rule(self, rule):
+        index = len(self.rules)
+        name = rule.get('name', f'rule-{index}')
+        if name in self._names:
+            raise ValueError(f"Duplicate prefilter rule name: {name}")
+        src = ipaddress.ip_network(rule['src'], strict=False) if rule.get('src') else None
+        protocol = rule.get('protocol')
+        ports = _parse_ports(rule.get('ports'))
+        self._names.add(name)
+        self.rules.append({
+            'name': name,
+            'src': src,
+            'ports': ports,
+            'port_lows': [low for low, _ in ports] if ports else None,
+            'protocol': protocol.upper() if protocol else None,
+        })
+        self.hits.append(0)
+
+        if rule.get('dst'):
+            dst = ipaddress.ip_network(rule['dst'], strict=False)
+            self._dst_tries[dst.version].insert(dst, index)
+        elif src is not None:
+            self._src_tries[src.version].insert(src, index)
+        else:
+            for version, trie in self._src_tries.items():
+                trie.insert(ipaddress.ip_network('0.0.0.0/0' if version == 4 else '::/0'), index)
+
+    def _port_matches(self, rule, port):
+        if rule['ports'] is None:
+            return True
+        i = bisect.bisect_right(rule['port_lows'], port) - 1
+        return i >= 0 and port <= rule['ports'][i][1]
+
+    def match(self, src_ip, dst_ip, port, protocol):
+        """
+        :return: Index of the matching rule with the most specific destination (then source), or None.
+        """
+        try:
+            src = ipaddress.ip_address(src_ip)
+            dst = ipaddress.ip_address(dst_ip)
+        except ValueError:
+            return None
+        protocol = str(protocol).upper()
+        candidates = self._dst_tries[dst.version].lookup(int(dst)) + self._src_tries[src.version].lookup(int(src))
+        for index in candidates:
+            rule = self.rules[index]
+            if rule['protocol'] is not None and rule['protocol'] != protocol:
+                continue
+            if rule['src'] is not None and (src.version != rule['src'].version or src not in rule['src']):
+                continue
+            if self._port_matches(rule, int(port)):
+                return index
+        return None
+
+    def apply(self, flows):
+        """
+        Check every flow of an extract_pcap_features DataFrame against the rules.
+        :return: Boolean array, True where the flow is allowlisted.
+        """
+        matched = np.zeros(len(flows), dtype=bool)
+        if not self.rules:
+            return matched
+        hits = []
+        rows = zip(flows['src_ip'], flows['dst_ip'], flows['Destination Port'], flows['protocol'])
+        for i, (src_ip, dst_ip, port, protocol) in enumerate(rows):
+            index = self.match(src_ip, dst_ip, port, protocol)
+            if index is not None:
+                matched[i] = True
+                hits.append(index)
+        with self._lock:
+            self.checked += len(flows)
+            for index in hits:
+                self.hits[index] += 1
+        return matched
+
+    def stats(self):
+        with self._lock:
+            matched = sum(self.hits)
+            return {
+                "rules": len(self.rules),
+                "flows_checked": self.checked,
+                "flows_skipped": matched,
+                "skip_rate": matched / self.checked if self.checked else 0.0,
+                "rule_hits": {rule['name']: hits for rule, hits in zip(self.rules, self.hits)},
+            }
@@ -0,0 +1,49 @@
+"""
+Production entry point: runs the detection pipeline as a separate process and serves the web UI/API
+with a multi-threaded WSGI server (waitress).
+
+    python serve.py --port 8080 --threads 16
+
+For several worker processes, start the service and the web workers separately with the same
+IDS_DETECTOR_ADDRESS / IDS_DETECTOR_AUTHKEY environment:
+
+    python detection_service.py &
+    gunicorn -w 4 -b 0.0.0.0:8080 App:app
+"""
+import argparse
+import multiprocessing
+import os
+import secrets
+
+from detection_service import DEFAULT_ADDRESS, run_service_from_env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the intrusion detection UI/API in production mode.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--threads', type=int, default=16, help="WSGI worker threads")
+    args = parser.parse_args()
+
+    # The detection service and the web layer share these settings through the environment
+    os.environ.setdefault('IDS_DETECTOR_ADDRESS', DEFAULT_ADDRESS)
+    os.environ.setdefault('IDS_DETECTOR_AUTHKEY', secrets.token_hex(16))
+
+    detector = multiprocessing.get_context('spawn').Process(target=run_service_from_env, name='detection-service',
+                                                             daemon=True)
+    detector.start()
+
+    from App import app
+    try:
+        from waitress import serve
+    except ImportError:
+        print("waitress is not installed (pip install waitress); falling back to Flask's threaded server")
+        app.run(host=args.host, port=args.port, threaded=True)
+    else:
+        serve(app, host=args.host, port=args.port, threads=args.threads)
+    finally:
+        detector.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,92 @@ let capturing = false;
 let totalPackets = 0;
 let totalAttacks = 0;
 let pollingInterval = null;
+let attackTypes = {};  // Encoded value -> attack type name, for analyst labels
+
+// Client-side state: the frontend only asks for packets newer than lastPacketId
+const POLL_INTERVAL_MS = 2000;
+const MAX_PACKETS = 10000;  // Packets kept in the table (newest first)
+const MAX_ALERTS = 10000;  // Alerts kept in the list (newest first)
+const ROW_HEIGHT = 40;  // Fixed row height in px, required for virtual scrolling
+const OVERSCAN = 8;  // Extra rows rendered above and below the visible window
+let lastPacketId = 0;
+let packets = [];
+let alerts = [];
+let pendingPackets = [];  // Received but not yet rendered
+let flushScheduled = false;
+let pollInFlight = false;  // A slow /get_packets response must not overlap the next poll
+const labelledPackets = new Set();
+const chosenLabels = new Map();  // Packet id -> label picked in the dropdown but not yet confirmed
+// Column widths shared by the header table and the virtualized body table, so the columns line up
+const COLUMN_WIDTHS = ["10%", "14%", "14%", "9%", "8%", "17%", "10%", "18%"];
+let packetTable = null;
+let alertList = null;
+
+// Renders only the rows inside the scroll viewport, so the DOM size stays constant
+// no matter how many items there are. Renders are batched to one per animation frame.
+class VirtualList {
+    constructor(viewport, window, body, rowHeight, renderRow) {
+        this.viewport = viewport;
+        this.window = window;  // Positioned element moved to the first rendered row
+        this.body = body;  // Element the rows are rendered into
+        this.rowHeight = rowHeight;
+        this.renderRow = renderRow;
+        this.items = [];
+        this.first = -1;
+        this.last = -1;
+        this.renderScheduled = false;
+
+        this.spacer = document.createElement("div");
+        this.spacer.className = "virtual-spacer";
+        viewport.appendChild(this.spacer);
+        viewport.addEventListener("scroll", () => this.scheduleRender(), { passive: true });
+    }
+
+    // Replace the items; `prepended` new items at the top keep a scrolled view in place
+    setItems(items, prepended = 0) {
+        this.items = items;
+        if (prepended > 0 && this.viewport.scrollTop > 0) {
+            this.viewport.scrollTop += prepended * this.rowHeight;
+        }
+        this.first = -1;  // Force a re-render
+        this.scheduleRender();
+    }
+
+    scheduleRender() {
+        if (this.renderScheduled) return;
+        this.renderScheduled = true;
+        requestAnimationFrame(() => {
+            this.renderScheduled = false;
+            this.render();
+        });
+    }
+
+    render() {
+        const total = this.items.length;
+        this.spacer.style.height = `${total * this.rowHeight}px`;
+
+        const visible = Math.ceil(this.viewport.clientHeight / this.rowHeight);
+        const first = Math.max(0, Math.floor(this.viewport.scrollTop / this.rowHeight) - OVERSCAN);
+        const last = Math.min(total, first + visible + 2 * OVERSCAN);
+        if (first === this.first && last === this.last) return;
+        this.first = first;
+        this.last = last;
+
+        const fragment = document.createDocumentFragment();
+        for (let i = first; i < last; i++) {
+            fragment.appendChild(this.renderRow(this.items[i]));
+        }
+        this.window.style.transform = `translateY(${first * this.rowHeight}px)`;
+        this.body.replaceChildren(fragment);
+    }
+}
+
+// Create an element with text content (never innerHTML for captured data)
+function cell(tag, text) {
+    const element = document.createElement(tag);
+    element.textContent = text;
+    return element;
+}
 
 // Fetch available network interfaces
 async function fetchNetworks() {
@@ -37,19 +123,21 @@ async function startCapture() {
         alert(response.data.status);
 
         // Clear existing data
-        document.getElementById("alertList").innerHTML = "";
+        packets = [];
+        alerts = [];
+        pendingPackets = [];
+        totalPackets = 0;
+        totalAttacks = 0;
         document.getElementById("totalPackets").textContent = "0";
         document.getElementById("totalAttacks").textContent = "0";
 
         // Initialize the feature container as a table
         initializeFeatureTable();
+        initializeAlertList();
 
-        totalPackets = 0;
-        totalAttacks = 0;
-
-        // Start polling for new packet data every 30 seconds
+        // Poll for new packets; each poll only returns packets newer than lastPacketId
         fetchPackets(); // Initial fetch
-        pollingInterval = setInterval(fetchPackets, 30000); // Then every 30 seconds
+        pollingInterval = setInterval(fetchPackets, POLL_INTERVAL_MS);
     } catch (error) {
         console.error("Error starting capture: ", error);
         alert("Failed to start capture.");
@@ -74,143 +162,215 @@ async function stopCapture() {
     }
 }
 
-// Initialize the feature container with a table
+// Initialize the feature container with a virtually scrolled table
 function initializeFeatureTable() {
     const featureContainer = document.getElementById("featureContainer");
+    const colgroup = `<colgroup>${COLUMN_WIDTHS.map(width => `<col style="width: ${width}">`).join("")}</colgroup>`;
     featureContainer.innerHTML = `
-        <table id="featureTable" class="feature-table">
+        <table class="feature-table">
+            ${colgroup}
             <thead>
                 <tr>
-                    <th>Time</th>
+                    <th>Flow Duration</th>
                     <th>Source IP</th>
                     <th>Destination IP</th>
+                    <th>Destination Port</th>
                     <th>Protocol</th>
-                    <th>Size</th>
                     <th>Prediction</th>
                     <th>Details</th>
+                    <th>Feedback</th>
                 </tr>
             </thead>
-            <tbody id="featureTableBody">
-                <!-- Feature rows will be added here -->
-            </tbody>
         </table>
+        <div id="featureViewport" class="virtual-viewport">
+            <table class="feature-table virtual-window">
+                ${colgroup}
+                <tbody id="featureTableBody"></tbody>
+            </table>
+        </div>
+        <div id="detailsPanel"></div>
     `;
+
+    packetTable = new VirtualList(
+        document.getElementById("featureViewport"),
+        document.querySelector("#featureViewport .virtual-window"),
+        document.getElementById("featureTableBody"),
+        ROW_HEIGHT,
+        renderPacketRow
+    );
+    packetTable.setItems(packets);
+}
+
+// Initialize the alert list with virtual scrolling
+function initializeAlertList() {
+    const alertSection = document.getElementById("alertList");
+    alertSection.innerHTML = "";
+    const list = document.createElement("ul");
+    list.className = "virtual-window";
+    alertSection.appendChild(list);
+    alertList = new VirtualList(alertSection, list, list, ROW_HEIGHT, renderAlertItem);
+    alertList.setItems(alerts);
+}
+
+// Build one feature table row
+function renderPacketRow(packet) {
+    const row = document.createElement("tr");
+    row.appendChild(cell("td", packet.flow_duration));
+    row.appendChild(cell("td", packet.source));
+    row.appendChild(cell("td", packet.destination));
+    row.appendChild(cell("td", packet.destination_port));
+    row.appendChild(cell("td", packet.protocol));
+    row.appendChild(cell("td", packet.host_alert ? `${packet.prediction} (host: ${packet.host_alert})` : packet.prediction));
+
+    const detailsCell = document.createElement("td");
+    const detailsButton = cell("button", "Show Details");
+    detailsButton.className = "btn-details";
+    detailsButton.onclick = () => showDetails(packet.id);
+    detailsCell.appendChild(detailsButton);
+    row.appendChild(detailsCell);
+
+    const feedbackCell = document.createElement("td");
+    const select = document.createElement("select");
+    select.className = "label-select";
+    // Rows are rebuilt on every flush, so keep an unconfirmed choice outside the DOM
+    select.innerHTML = labelOptions(chosenLabels.has(packet.id) ? chosenLabels.get(packet.id) : packet.prediction_id);
+    select.onchange = () => chosenLabels.set(packet.id, Number(select.value));
+    const confirmButton = cell("button", labelledPackets.has(packet.id) ? "Saved" : "Confirm");
+    confirmButton.className = "btn-details";
+    confirmButton.disabled = labelledPackets.has(packet.id);
+    confirmButton.onclick = () => submitLabel(confirmButton, packet.id);
+    feedbackCell.appendChild(select);
+    feedbackCell.appendChild(confirmButton);
+    row.appendChild(feedbackCell);
+    return row;
+}
+
+// Build one alert list item
+function renderAlertItem(packet) {
+    const alertItem = cell("li", `🚨 Detected ${packet.prediction} attack from ${packet.source} to ${packet.destination} (#${packet.id})`);
+    alertItem.className = "alert-item";
+    return alertItem;
 }
 
-// Fetch packets and update the UI
+// Fetch new packets and queue them for rendering
 async function fetchPackets() {
-    if (!capturing) return;
+    if (!capturing || pollInFlight) return;
+    pollInFlight = true;
 
     try {
-        const response = await axios.get('/get_packets');
-        const packets = response.data.packets;
-
-        if (packets && packets.length > 0) {
-            // Get the feature table body
-            const featureTableBody = document.getElementById("featureTableBody");
-
-            // Add new packets to the feature table
-            packets.forEach(packet => {
-                // Add feature row
-                const featureRow = document.createElement("tr");
-                featureRow.innerHTML = `
-                    <td>${packet.time}</td>
-                    <td>${packet.source}</td>
-                    <td>${packet.destination}</td>
-                    <td>${packet.protocol}</td>
-                    <td>${packet.size}</td>
-                    <td>${packet.prediction}</td>
-                    <td>
-                        <button class="btn-details" onclick="toggleDetails(this)" data-details='${JSON.stringify(packet.features)}'>
-                            Show Details
-                        </button>
-                    </td>
-                `;
-
-                // Add row at the top of the table
-                featureTableBody.insertBefore(featureRow, featureTableBody.firstChild);
-
-                // Add alerts for detected attacks
-                if (packet.prediction !== "benign") {
-                    addAlertEntry(packet);
-                    totalAttacks++;
-                }
-
-                totalPackets++;
-            });
-
-            // Limit the number of rows to prevent the table from getting too large
-            while (featureTableBody.children.length > 50) {
-                featureTableBody.removeChild(featureTableBody.lastChild);
-            }
-
-            // Update stats
-            document.getElementById("totalPackets").textContent = totalPackets;
-            document.getElementById("totalAttacks").textContent = totalAttacks;
+        const response = await axios.get('/get_packets', { params: { since: lastPacketId } });
+        // Drop anything already queued or rendered (e.g. a response to a poll sent before a restart)
+        const newPackets = (response.data.packets || []).filter(packet => packet.id > lastPacketId);
+        lastPacketId = Math.max(lastPacketId, response.data.latest_id || 0);
+
+        if (newPackets.length > 0) {
+            pendingPackets.push(...newPackets);
+            scheduleFlush();
         }
     } catch (error) {
         console.error("Error fetching packets: ", error);
+    } finally {
+        pollInFlight = false;
     }
 }
 
-// Toggle showing detailed features
-function toggleDetails(button) {
-    const details = JSON.parse(button.getAttribute('data-details'));
-    const parentRow = button.parentNode.parentNode;
-
-    // Check if details row already exists
-    const nextRow = parentRow.nextSibling;
-    if (nextRow && nextRow.classList && nextRow.classList.contains('details-row')) {
-        // Remove details row if it exists
-        nextRow.parentNode.removeChild(nextRow);
-        button.textContent = 'Show Details';
-    } else {
-        // Create new details row
-        const detailsRow = document.createElement('tr');
-        detailsRow.className = 'details-row';
-
-        // Create details cell that spans all columns
-        const detailsCell = document.createElement('td');
-        detailsCell.colSpan = 7;
-
-        // Create a table for the details
-        let detailsHTML = '<table class="details-table">';
-        for (const [key, value] of Object.entries(details)) {
-            detailsHTML += `<tr><th>${key}</th><td>${value}</td></tr>`;
-        }
-        detailsHTML += '</table>';
+// Apply all pending packets in one animation frame
+function scheduleFlush() {
+    if (flushScheduled) return;
+    flushScheduled = true;
+    requestAnimationFrame(() => {
+        flushScheduled = false;
+        flushPackets();
+    });
+}
 
-        detailsCell.innerHTML = detailsHTML;
-        detailsRow.appendChild(detailsCell);
+function flushPackets() {
+    // Pending packets are oldest first; the table and alert list show newest first
+    const incoming = pendingPackets.reverse();
+    pendingPackets = [];
+    const newAlerts = incoming.filter(packet => packet.prediction !== "Benign");
 
-        // Insert after the current row
-        if (parentRow.nextSibling) {
-            parentRow.parentNode.insertBefore(detailsRow, parentRow.nextSibling);
-        } else {
-            parentRow.parentNode.appendChild(detailsRow);
+    packets = incoming.concat(packets).slice(0, MAX_PACKETS);
+    alerts = newAlerts.concat(alerts).slice(0, MAX_ALERTS);
+    totalPackets += incoming.length;
+    totalAttacks += newAlerts.length;
+
+    if (packetTable) packetTable.setItems(packets, incoming.length);
+    if (alertList) alertList.setItems(alerts, newAlerts.length);
+
+    // Update stats
+    document.getElementById("totalPackets").textContent = totalPackets;
+    document.getElementById("totalAttacks").textContent = totalAttacks;
+}
+
+// Show all features of one packet below the table (fetched on demand)
+async function showDetails(packetId) {
+    const panel = document.getElementById("detailsPanel");
+    try {
+        const response = await axios.get(`/packet/${packetId}`);
+        const table = document.createElement("table");
+        table.className = "details-table";
+        for (const [key, value] of Object.entries(response.data.features)) {
+            const row = document.createElement("tr");
+            row.appendChild(cell("th", key));
+            row.appendChild(cell("td", value));
+            table.appendChild(row);
         }
 
-        button.textContent = 'Hide Details';
+        const closeButton = cell("button", "Hide Details");
+        closeButton.className = "btn-details";
+        closeButton.onclick = () => panel.replaceChildren();
+        panel.replaceChildren(cell("h3", `Packet #${packetId}`), closeButton, table);
+    } catch (error) {
+        console.error("Error fetching packet details: ", error);
+        alert("Packet details are no longer available.");
     }
 }
 
-// Add an alert entry for detected attacks
-function addAlertEntry(packet) {
-    const alertList = document.getElementById("alertList");
-    const alertItem = document.createElement("li");
-    alertItem.textContent = `🚨 Detected ${packet.prediction} attack from ${packet.source} to ${packet.destination} at ${packet.time}`;
+// Build the <option> list for the label dropdown, preselecting the model's verdict
+function labelOptions(selected) {
+    return Object.entries(attackTypes).map(([value, name]) =>
+        `<option value="${value}" ${Number(value) === selected ? "selected" : ""}>${name}</option>`
+    ).join("");
+}
 
-    // Add a class for styling
-    alertItem.className = "alert-item";
+// Fetch the attack types analysts can label flows with
+async function fetchAttackTypes() {
+    try {
+        const response = await axios.get('/attack_types');
+        attackTypes = response.data;
+    } catch (error) {
+        console.error("Error fetching attack types: ", error);
+    }
+}
 
-    // Add the alert to the top of the list
-    alertList.insertBefore(alertItem, alertList.firstChild);
+// Send the analyst's confirmation or correction of a verdict
+async function submitLabel(button, packetId) {
+    const label = button.parentNode.querySelector(".label-select").value;
+    try {
+        await axios.post('/label', { id: packetId, label: Number(label) });
+        labelledPackets.add(packetId);
+        button.textContent = "Saved";
+        button.disabled = true;
+    } catch (error) {
+        console.error("Error saving label: ", error);
+        alert("Failed to save label.");
+    }
+}
 
-    // Limit the number of alerts shown
-    while (alertList.children.length > 20) {
-        alertList.removeChild(alertList.lastChild);
+// Start a background model update from the labelled flows
+async function updateModels() {
+    try {
+        const response = await axios.post('/update_models');
+        alert(response.data.message);
+    } catch (error) {
+        console.error("Error starting model update: ", error);
+        alert("Failed to start model update.");
     }
 }
 
 // Fetch networks on page load
-window.onload = fetchNetworks;
\ No newline at end of file
+window.onload = () => {
+    fetchNetworks();
+    fetchAttackTypes();
+};
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from numpy.lib.format import open_memmap
+from sklearn.preprocessing import StandardScaler
+
+# Columns that are never used as model features
+NON_FEATURE_COLUMNS = ['Label', 'Label_Encoded', 'Timestamp']
+
+
+def open_dataset(path):
+    """
+    Memory-map an aggregated Arrow/Feather file.
+    Uncompressed files are read zero-copy; compressed ones still work but are decompressed into RAM.
+    :param path: Path to the .feather file written by data_cleaning.aggregate_data.
+    :return: pyarrow Table backed by the mapped file.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    print(f"Dataset mapped from: {path} ({table.num_rows} rows, {table.num_columns} columns)")
+    return table
+
+
+def feature_columns(table):
+    """
+    Names of the numeric feature columns, in file order.
+    """
+    return [field.name for field in table.schema
+            if field.name not in NON_FEATURE_COLUMNS and not pa.types.is_string(field.type)
+            and not pa.types.is_dictionary(field.type)]
+
+
+def encode_labels(table, column='Label'):
+    """
+    Encode the label column into integers without converting the table to pandas.
+    Labels are numbered in order of first appearance, like `df['Label'].unique()`.
+    :return: (encoded labels as int32 array, {label: encoded value})
+    """
+    labels = table.column(column)
+    if pa.types.is_dictionary(labels.type):
+        labels = labels.cast(pa.string())
+    unique = pc.unique(labels)
+    label_mapping = {label: idx for idx, label in enumerate(unique.to_pylist())}
+    y = pc.index_in(labels, value_set=unique).to_numpy().astype(np.int32)
+    return y, label_mapping
+
+
+def iter_feature_batches(table, columns, batch_size=65536):
+    """
+    Yield the feature columns as float32 matrices of at most `batch_size` rows.
+    """
+    for batch in table.select(columns).to_batches(max_chunksize=batch_size):
+        X = np.empty((batch.num_rows, len(columns)), dtype=np.float32)
+        for i, array in enumerate(batch.columns):
+            X[:, i] = array.to_numpy(zero_copy_only=False)
+        yield X
+
+
+def fit_scaler(table, columns, batch_size=65536):
+    """
+    Fit a StandardScaler incrementally with `partial_fit`, one batch at a time.
+    """
+    scaler = StandardScaler()
+    for X in iter_feature_batches(table, columns, batch_size):
+        scaler.partial_fit(pd.DataFrame(X, columns=columns, copy=False))
+    return scaler
+
+
+def write_scaled(table, columns, scaler, path, positions=None, batch_size=65536):
+    """
+    Scale the features batch by batch into a float32 .npy file and return it memory-mapped.
+    :param positions: Optional permutation; row i of the table is written to row positions[i],
+                      so a shuffled train/test split becomes two contiguous slices.
+    :return: Read-only memmap of shape (rows, features).
+    """
+    X_scaled = open_memmap(path, mode='w+', dtype=np.float32, shape=(table.num_rows, len(columns)))
+    start = 0
+    for X in iter_feature_batches(table, columns, batch_size):
+        stop = start + len(X)
+        rows = slice(start, stop) if positions is None else positions[start:stop]
+        X_scaled[rows] = scaler.transform(pd.DataFrame(X, columns=columns, copy=False))
+        start = stop
+    X_scaled.flush()
+    del X_scaled
+    print(f"Scaled features written to: {path}")
+    return np.load(path, mmap_mode='r')
+
+
+def iter_array_batches(X, y, batch_size, start=0, stop=None, shuffle=True, seed=42, indices=None):
+    """
+    Endless generator of (features, labels) batches from rows [start, stop) of an array or memmap.
+    Batches are contiguous slices, so only one batch is paged in at a time; with `shuffle` the
+    batch order changes every epoch.
+    :param indices: Optional sorted row indices; `start`/`stop` then refer to positions in `indices`.
+    """
+    stop = (len(X) if indices is None else len(indices)) if stop is None else stop
+    starts = np.arange(start, stop, batch_size)
+    rng = np.random.default_rng(seed)
+    while True:
+        if shuffle:
+            rng.shuffle(starts)
+        for s in starts:
+            e = min(s + batch_size, stop)
+            if indices is None:
+                yield np.asarray(X[s:e]), np.asarray(y[s:e])
+            else:
+                rows = indices[s:e]
+                yield np.asarray(X[rows]), np.asarray(y[rows])
@@ -0,0 +1,321 @@
+import hashlib
+import json
+import os
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+
+from attack_types import label_mapping_mismatches
+from data_reduction import reduce_training_set, stratified_cap
+from training_data import open_dataset, feature_columns, encode_labels, fit_scaler, write_scaled, iter_array_batches
+
+# Default training configuration. Every stage is cached under `cache_dir`, keyed by a hash of
+# the input file and the parts of this config it depends on.
+DEFAULT_CONFIG = {
+    'data_path': "/Users/avinash/Documents/capstone Project/datasets/clean/all_data.feather",
+    'cache_dir': "/Users/avinash/Documents/capstone Project/datasets/cache",
+    'model_dir': "/Users/avinash/Documents/capstone Project/models",
+    'seed': 42,
+    'test_size': 0.2,
+    'validation_split': 0.2,
+    'label_overrides': {},  # e.g. {'DoS Hulk': 'DoS'} to merge or rename classes
+    'reduction': {'max_per_class': None, 'dedup_decimals': None},  # see data_reduction.reduce_training_set
+    'replay_per_class': 2000,  # rows per class kept in models/replay.npz for incremental updates
+    'rf': {'n_estimators': 100, 'class_weight': 'balanced', 'n_jobs': None},  # None: cores left after the NN
+    'nn': {'epochs': 30, 'batch_size': 1024, 'threads': max(1, (os.cpu_count() or 4) // 4)},
+}
+
+DONE_MARKER = '_done'
+
+
+def input_fingerprint(path, sample_bytes=1 << 20):
+    """
+    Cheap content hash of the dataset: size, mtime and the first/last megabyte of the file.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_bytes))
+        f.seek(max(0, stat.st_size - sample_bytes))
+        digest.update(f.read(sample_bytes))
+    return digest.hexdigest()[:16]
+
+
+def run_stage(cache_dir, name, key_parts, build, force=False):
+    """
+    Run one pipeline stage unless a finished result with the same key is cached.
+    `build(path)` writes the stage's artifacts into a scratch directory that is only moved into
+    place once it returns, so an interrupted stage is simply rerun on the next attempt.
+    :return: (stage key, stage directory)
+    """
+    key = hashlib.sha1(json.dumps(key_parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f'{name}-{key}')
+    if os.path.exists(os.path.join(path, DONE_MARKER)) and not force:
+        print(f"[{name}] cached: {path}")
+        return key, path
+
+    print(f"[{name}] running...")
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    build(tmp_path)
+    open(os.path.join(tmp_path, DONE_MARKER), 'w').close()
+    os.rename(tmp_path, path)
+    print(f"[{name}] done: {path}")
+    return key, path
+
+
+def _apply_label_overrides(y, label_mapping, overrides):
+    if not overrides:
+        return y, label_mapping
+    names = [overrides.get(label, label) for label in label_mapping]
+    new_mapping = {}
+    for name in names:
+        new_mapping.setdefault(name, len(new_mapping))
+    lookup = np.array([new_mapping[name] for name in names], dtype=np.int32)
+    return lookup[y], new_mapping
+
+
+def load_targets(labels_path, split_path):
+    """
+    Labels in the shuffled row order of the scaled feature file.
+    """
+    y = np.load(os.path.join(labels_path, 'y.npy'))
+    positions = np.load(os.path.join(split_path, 'positions.npy'))
+    y_shuffled = np.empty_like(y)
+    y_shuffled[positions] = y
+    return y_shuffled
+
+
+def _evaluate(name, y_test, y_pred, path):
+    report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+    with open(os.path.join(path, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return (f"\n{name} Classification Results:\n"
+            f"Accuracy: {accuracy_score(y_test, y_pred)}\n"
+            f"Classification Report:\n{classification_report(y_test, y_pred, zero_division=0)}\n"
+            f"Confusion Matrix:\n{confusion_matrix(y_test, y_pred)}")
+
+
+def training_rows(stages):
+    """
+    Row indices the models are trained on: the reduced set when a `reduced` stage ran,
+    otherwise None, meaning the full contiguous training slice [0, n_train).
+    """
+    if stages.get('reduced') is None:
+        return None
+    return np.load(os.path.join(stages['reduced'], 'train_idx.npy'))
+
+
+def _train_rf(path, stages, rf_config, seed):
+    from sklearn.ensemble import RandomForestClassifier
+
+    n_train = stages['n_train']
+    X = np.load(os.path.join(stages['scaled'], 'X.npy'), mmap_mode='r')
+    y = load_targets(stages['labels'], stages['split'])
+    rows = training_rows(stages)
+
+    rf_clf = RandomForestClassifier(n_estimators=rf_config['n_estimators'], random_state=seed, verbose=1,
+                                    class_weight=rf_config['class_weight'], n_jobs=rf_config['n_jobs'],
+                                    max_depth=rf_config.get('max_depth'))
+    if rows is None:
+        rf_clf.fit(X[:n_train], y[:n_train])
+    else:
+        rf_clf.fit(X[rows], y[rows])
+    joblib.dump(rf_clf, os.path.join(path, 'random_forest_multiclass.joblib'))
+    return _evaluate("Random Forest", y[n_train:], rf_clf.predict(X[n_train:]), path)
+
+
+def _train_nn(path, stages, n_classes, nn_config, validation_split, seed, backup_dir):
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Dropout
+
+    tf.config.threading.set_intra_op_parallelism_threads(nn_config['threads'])
+    tf.keras.utils.set_random_seed(seed)
+
+    n_train = stages['n_train']
+    X = np.load(os.path.join(stages['scaled'], 'X.npy'), mmap_mode='r')
+    y = load_targets(stages['labels'], stages['split'])
+    rows = training_rows(stages)
+    batch_size = nn_config['batch_size']
+    n_rows = n_train if rows is None else len(rows)
+    n_fit = int(n_rows * (1 - validation_split))
+
+    model = Sequential([
+        Dense(128, activation='relu', input_shape=(X.shape[1],)),  # Input layer
+        Dropout(0.3),  # Dropout for regularization
+        Dense(64, activation='relu'),  # Hidden layer
+        Dropout(0.3),  # Dropout for regularization
+        Dense(n_classes, activation='softmax')  # Output layer (one node per class)
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+
+    # BackupAndRestore lets an interrupted run continue from the last finished epoch
+    model.fit(iter_array_batches(X, y, batch_size, 0, n_fit, seed=seed, indices=rows),
+              steps_per_epoch=int(np.ceil(n_fit / batch_size)),
+              validation_data=iter_array_batches(X, y, batch_size, n_fit, n_rows, shuffle=False, indices=rows),
+              validation_steps=int(np.ceil((n_rows - n_fit) / batch_size)),
+              epochs=nn_config['epochs'], verbose=2,
+              callbacks=[tf.keras.callbacks.BackupAndRestore(backup_dir)])
+    model.save(os.path.join(path, 'neural_network_multiclass.h5'))
+
+    y_pred = np.concatenate([np.argmax(model.predict_on_batch(X[i:i + 65536]), axis=1)
+                             for i in range(n_train, len(X), 65536)])
+    return _evaluate("Neural Network", y[n_train:], y_pred, path)
+
+
+def prepare_data(config=None, force=()):
+    """
+    Run (or load from the cache) the data stages: labels -> scaler -> split -> scaled -> reduced.
+    :return: Dict with the stage directories, their cache keys, `n_train` and `label_mapping`.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    cache_dir = config['cache_dir']
+    os.makedirs(cache_dir, exist_ok=True)
+
+    fingerprint = input_fingerprint(config['data_path'])
+    table = open_dataset(config['data_path'])
+    columns = feature_columns(table)
+    n_rows = table.num_rows
+    n_train = int(n_rows * (1 - config['test_size']))
+
+    # 1. Encode labels
+    def build_labels(path):
+        y, label_mapping = encode_labels(table)
+        y, label_mapping = _apply_label_overrides(y, label_mapping, config['label_overrides'])
+        np.save(os.path.join(path, 'y.npy'), y)
+        with open(os.path.join(path, 'label_mapping.json'), 'w') as f:
+            json.dump(label_mapping, f, indent=2)
+
+    labels_key, labels_path = run_stage(cache_dir, 'labels', [fingerprint, config['label_overrides']],
+                                        build_labels, 'labels' in force)
+    with open(os.path.join(labels_path, 'label_mapping.json')) as f:
+        label_mapping = json.load(f)
+    print("Label Encoding Mapping:")
+    for label, encoded_value in label_mapping.items():
+        print(f"Attack Type: {label}, Encoded Value: {encoded_value}")
+
+    # 2. Fit the scaler
+    def build_scaler(path):
+        joblib.dump(fit_scaler(table, columns), os.path.join(path, 'scaler.joblib'))
+
+    scaler_key, scaler_path = run_stage(cache_dir, 'scaler', [fingerprint, columns], build_scaler, 'scaler' in force)
+
+    # 3. Shuffled train/test split
+    def build_split(path):
+        np.save(os.path.join(path, 'positions.npy'), np.random.default_rng(config['seed']).permutation(n_rows))
+
+    split_key, split_path = run_stage(cache_dir, 'split', [fingerprint, n_rows, config['seed'], config['test_size']],
+                                      build_split, 'split' in force)
+
+    # 4. Scaled float32 features in shuffled order
+    def build_scaled(path):
+        scaler = joblib.load(os.path.join(scaler_path, 'scaler.joblib'))
+        positions = np.load(os.path.join(split_path, 'positions.npy'))
+        write_scaled(table, columns, scaler, os.path.join(path, 'X.npy'), positions=positions)
+
+    scaled_key, scaled_path = run_stage(cache_dir, 'scaled', [scaler_key, split_key], build_scaled, 'scaled' in force)
+    del table
+
+    stages = {'labels': labels_path, 'scaler': scaler_path, 'split': split_path, 'scaled': scaled_path,
+              'reduced': None, 'n_train': n_train, 'label_mapping': label_mapping,
+              'keys': {'labels': labels_key, 'scaled': scaled_key, 'reduced': None}}
+
+    # 5. Optional class-aware reduction of the training rows
+    reduction = {**DEFAULT_CONFIG['reduction'], **config['reduction']}  # Allow partial overrides
+    if reduction['max_per_class'] is not None or reduction['dedup_decimals'] is not None:
+        def build_reduced(path):
+            X = np.load(os.path.join(scaled_path, 'X.npy'), mmap_mode='r')
+            y = load_targets(labels_path, split_path)
+            rows = reduce_training_set(X, y, n_train, seed=config['seed'], **reduction)
+            np.save(os.path.join(path, 'train_idx.npy'), rows)
+
+        reduced_key, reduced_path = run_stage(cache_dir, 'reduced',
+                                              [labels_key, scaled_key, n_train, config['seed'], reduction],
+                                              build_reduced, 'reduced' in force)
+        stages['reduced'] = reduced_path
+        stages['keys']['reduced'] = reduced_key
+
+    return stages
+
+
+def run_pipeline(config=None, force=()):
+    """
+    Train the Random Forest and Neural Network through cached, resumable stages:
+    labels -> scaler -> split -> scaled -> [reduced] -> (rf, nn). Each finished stage is reused when
+    its inputs and config are unchanged, so e.g. a label override only reruns `labels`, `rf` and `nn`.
+    The two models are trained concurrently in separate processes.
+    :param config: Overrides for DEFAULT_CONFIG.
+    :param force: Names of stages to rerun even if cached.
+    :return: Paths of the stage directories.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    cache_dir = config['cache_dir']
+    os.makedirs(config['model_dir'], exist_ok=True)
+
+    stages = prepare_data(config, force)
+    keys = stages['keys']
+    label_mapping = stages['label_mapping']
+    worker_stages = {k: v for k, v in stages.items() if k not in ('keys', 'label_mapping')}
+
+    # 6. Train both models concurrently
+    nn_config = config['nn']
+    rf_config = dict(config['rf'])
+    if rf_config['n_jobs'] is None:
+        rf_config['n_jobs'] = max(1, (os.cpu_count() or 1) - nn_config['threads'])
+
+    data_parts = [keys['labels'], keys['scaled'], keys['reduced'], stages['n_train'], config['seed']]
+    rf_parts = data_parts + [config['rf']]
+    nn_parts = data_parts + [config['validation_split'], {k: v for k, v in nn_config.items() if k != 'threads'}]
+    nn_backup_dir = os.path.join(cache_dir, 'nn-backup-' + hashlib.sha1(
+        json.dumps(nn_parts, sort_keys=True).encode()).hexdigest()[:16])
+    reports = {}
+
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as pool:
+        def train_rf(path):
+            reports['rf'] = pool.submit(_train_rf, path, worker_stages, rf_config, config['seed']).result()
+
+        def train_nn(path):
+            reports['nn'] = pool.submit(_train_nn, path, worker_stages, len(label_mapping), nn_config,
+                                        config['validation_split'], config['seed'], nn_backup_dir).result()
+
+        # Each stage waits on its own worker, so run the two waits side by side
+        with ThreadPoolExecutor(max_workers=2) as waits:
+            rf_future = waits.submit(run_stage, cache_dir, 'rf', rf_parts, train_rf, 'rf' in force)
+            nn_future = waits.submit(run_stage, cache_dir, 'nn', nn_parts, train_nn, 'nn' in force)
+            rf_key, rf_path = rf_future.result()
+            nn_key, nn_path = nn_future.result()
+    shutil.rmtree(nn_backup_dir, ignore_errors=True)
+
+    for report in reports.values():
+        print(report)
+
+    # 7. Publish the artifacts where App.py and model_prediction.py expect them
+    model_dir = config['model_dir']
+    shutil.copy(os.path.join(stages['scaler'], 'scaler.joblib'), os.path.join(model_dir, 'scaler.joblib'))
+    shutil.copy(os.path.join(stages['labels'], 'label_mapping.json'), os.path.join(model_dir, 'label_mapping.json'))
+    mismatched = label_mapping_mismatches(label_mapping)
+    if mismatched:
+        print(f"Note: class ids differ from attack_types.ATTACK_TYPES ({'; '.join(mismatched)}). "
+              f"App.py serves the names from {os.path.join(model_dir, 'label_mapping.json')}.")
+    shutil.copy(os.path.join(rf_path, 'random_forest_multiclass.joblib'), model_dir)
+    shutil.copy(os.path.join(nn_path, 'neural_network_multiclass.h5'), model_dir)
+    # Which scaled/shuffled data the models were trained on, so evaluations can check their held-out rows
+    with open(os.path.join(model_dir, 'training_data.json'), 'w') as f:
+        json.dump({'scaled': keys['scaled'], 'n_train': stages['n_train']}, f, indent=2)
+
+    # Small stratified sample of scaled training rows, mixed into incremental updates (incremental_update.py)
+    X = np.load(os.path.join(stages['scaled'], 'X.npy'), mmap_mode='r')
+    y = load_targets(stages['labels'], stages['split'])
+    rows = stratified_cap(y, np.arange(stages['n_train']), config['replay_per_class'], config['seed'])
+    np.savez(os.path.join(model_dir, 'replay.npz'), X=np.asarray(X[rows]), y=y[rows])
+    print(f"\nTraining and evaluation complete. Models are saved to: {model_dir}")
+
+    return {'labels': stages['labels'], 'scaler': stages['scaler'], 'split': stages['split'],
+            'scaled': stages['scaled'], 'reduced': stages['reduced'], 'rf': rf_path, 'nn': nn_path}
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class VerdictCache:
+    """
+    LRU cache with a TTL that maps quantized, scaled feature vectors to model verdicts.
+    Repetitive traffic (health checks, monitoring polls, DNS-like UDP) produces near-identical
+    flows, so their verdicts can be reused instead of running both models again.
+    """
+
+    def __init__(self, max_size=50000, ttl=300, decimals=2):
+        """
+        :param max_size: Maximum number of cached verdicts; least recently used ones are evicted.
+        :param ttl: Seconds a verdict stays valid.
+        :param decimals: Scaled features are rounded to this many decimals before hashing.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.decimals = decimals
+        self._entries = OrderedDict()  # key -> (verdict, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.generation = 0  # Bumped by clear(); stale put_many calls are dropped
+
+    def keys_for(self, features):
+        """
+        One key per row of the scaled feature matrix: a 128-bit digest of the quantized row, so
+        distinct rows don't share a verdict through a hash collision.
+        """
+        quantized = np.ascontiguousarray(np.round(features, self.decimals) + 0.0, dtype=np.float32)
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in quantized]
+
+    def get_many(self, keys):
+        """
+        :return: Cached verdict for every key, or None where there is no valid entry.
+        """
+        now = time.monotonic()
+        verdicts = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    verdicts.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    verdicts.append(entry[0])
+        return verdicts
+
+    def put_many(self, keys, verdicts, generation=None):
+        """
+        :param generation: Value of `generation` read before the verdicts were computed. If the
+            cache was cleared since, the verdicts may come from replaced models and are dropped.
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, verdict in zip(keys, verdicts):
+                self._entries[key] = (verdict, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all verdicts, e.g. after the models were updated.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }